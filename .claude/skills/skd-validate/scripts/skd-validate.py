@@ -7,7 +7,7 @@ import sys
 from lxml import etree
 
 sys.stdout.reconfigure(encoding="utf-8")
-    sys.stderr.reconfigure(encoding="utf-8")
+sys.stderr.reconfigure(encoding="utf-8")
 
 # ── arg parsing ──────────────────────────────────────────────
 
@@ -142,21 +142,19 @@ def inner_text(node):
 
 # ── 3. Root element checks ───────────────────────────────────
 
-if local_name(root) != "DataCompositionSchema":
-    report_error(f"Root element is '{local_name(root)}', expected 'DataCompositionSchema'")
-else:
-    report_ok("Root element: DataCompositionSchema")
+def check_root():
+    if local_name(root) != "DataCompositionSchema":
+        report_error(f"Root element is '{local_name(root)}', expected 'DataCompositionSchema'")
+    else:
+        report_ok("Root element: DataCompositionSchema")
 
-expected_ns = "http://v8.1c.ru/8.1/data-composition-system/schema"
-root_ns = etree.QName(root.tag).namespace or ""
-if root_ns != expected_ns:
-    report_error(f"Default namespace is '{root_ns}', expected '{expected_ns}'")
-else:
-    report_ok("Default namespace correct")
+    expected_ns = "http://v8.1c.ru/8.1/data-composition-system/schema"
+    root_ns = etree.QName(root.tag).namespace or ""
+    if root_ns != expected_ns:
+        report_error(f"Default namespace is '{root_ns}', expected '{expected_ns}'")
+    else:
+        report_ok("Default namespace correct")
 
-if stopped:
-    finalize()
-    sys.exit(1)
 
 # ── 4. Collect inventories ───────────────────────────────────
 
@@ -242,89 +240,85 @@ for key in calc_field_paths:
 
 # ── 5. DataSource checks ─────────────────────────────────────
 
-if len(data_source_nodes) == 0:
-    report_warn("No dataSource elements found (settings-only DCS?)")
-else:
-    ds_names_seen = {}
-    ds_ok = True
-    for dsn in data_source_nodes:
-        name = find(dsn, "s:name")
-        typ = find(dsn, "s:dataSourceType")
-        if name is None or not inner_text(name):
-            report_error("DataSource has empty name")
-            ds_ok = False
-        elif inner_text(name) in ds_names_seen:
-            report_error(f"Duplicate dataSource name: {inner_text(name)}")
-            ds_ok = False
-        else:
-            ds_names_seen[inner_text(name)] = True
-        if typ is not None:
-            tv = inner_text(typ)
-            if tv not in ("Local", "External"):
-                report_warn(f"DataSource '{inner_text(name)}' has unusual type: {tv}")
-    if ds_ok:
-        report_ok(f"{len(data_source_nodes)} dataSource(s) found, names unique")
-
-if stopped:
-    finalize()
-    sys.exit(1)
-
-# ── 6. DataSet checks ────────────────────────────────────────
+def check_data_sources():
+    if len(data_source_nodes) == 0:
+        report_warn("No dataSource elements found (settings-only DCS?)")
+    else:
+        ds_names_seen = {}
+        ds_ok = True
+        for dsn in data_source_nodes:
+            name = find(dsn, "s:name")
+            typ = find(dsn, "s:dataSourceType")
+            if name is None or not inner_text(name):
+                report_error("DataSource has empty name")
+                ds_ok = False
+            elif inner_text(name) in ds_names_seen:
+                report_error(f"Duplicate dataSource name: {inner_text(name)}")
+                ds_ok = False
+            else:
+                ds_names_seen[inner_text(name)] = True
+            if typ is not None:
+                tv = inner_text(typ)
+                if tv not in ("Local", "External"):
+                    report_warn(f"DataSource '{inner_text(name)}' has unusual type: {tv}")
+        if ds_ok:
+            report_ok(f"{len(data_source_nodes)} dataSource(s) found, names unique")
 
-valid_ds_types = ("DataSetQuery", "DataSetObject", "DataSetUnion")
 
-if len(data_set_nodes) == 0:
-    report_warn("No dataSet elements found (settings-only DCS?)")
-else:
-    ds_names_seen = {}
-    ds_ok = True
-    for ds in data_set_nodes:
-        xsi_type = ds.get(XSI_TYPE, "")
-        name_node = find(ds, "s:name")
-        ds_name = inner_text(name_node) if name_node is not None else "(unnamed)"
+# ── 6. DataSet checks ────────────────────────────────────────
 
-        if name_node is None or not inner_text(name_node):
-            report_error("DataSet has empty name")
-            ds_ok = False
-        elif ds_name in ds_names_seen:
-            report_error(f"Duplicate dataSet name: {ds_name}")
-            ds_ok = False
-        else:
-            ds_names_seen[ds_name] = True
-
-        if not xsi_type:
-            report_error(f"DataSet '{ds_name}' missing xsi:type")
-            ds_ok = False
-        elif xsi_type not in valid_ds_types:
-            report_warn(f"DataSet '{ds_name}' has unusual xsi:type: {xsi_type}")
-
-        # Check dataSource reference
-        if xsi_type != "DataSetUnion":
-            src_node = find(ds, "s:dataSource")
-            if src_node is not None and inner_text(src_node):
-                if inner_text(src_node) not in data_source_names:
-                    report_error(f"DataSet '{ds_name}' references unknown dataSource: {inner_text(src_node)}")
-                    ds_ok = False
+def check_data_sets():
+    valid_ds_types = ("DataSetQuery", "DataSetObject", "DataSetUnion")
+
+    if len(data_set_nodes) == 0:
+        report_warn("No dataSet elements found (settings-only DCS?)")
+    else:
+        ds_names_seen = {}
+        ds_ok = True
+        for ds in data_set_nodes:
+            xsi_type = ds.get(XSI_TYPE, "")
+            name_node = find(ds, "s:name")
+            ds_name = inner_text(name_node) if name_node is not None else "(unnamed)"
+
+            if name_node is None or not inner_text(name_node):
+                report_error("DataSet has empty name")
+                ds_ok = False
+            elif ds_name in ds_names_seen:
+                report_error(f"Duplicate dataSet name: {ds_name}")
+                ds_ok = False
+            else:
+                ds_names_seen[ds_name] = True
 
-        # Check query not empty for Query type
-        if xsi_type == "DataSetQuery":
-            query_node = find(ds, "s:query")
-            if query_node is None or not text_of(query_node):
-                report_warn(f"DataSet '{ds_name}' (Query) has empty query")
-
-        # Check objectName for Object type
-        if xsi_type == "DataSetObject":
-            obj_node = find(ds, "s:objectName")
-            if obj_node is None or not text_of(obj_node):
-                report_error(f"DataSet '{ds_name}' (Object) has empty objectName")
+            if not xsi_type:
+                report_error(f"DataSet '{ds_name}' missing xsi:type")
                 ds_ok = False
+            elif xsi_type not in valid_ds_types:
+                report_warn(f"DataSet '{ds_name}' has unusual xsi:type: {xsi_type}")
+
+            # Check dataSource reference
+            if xsi_type != "DataSetUnion":
+                src_node = find(ds, "s:dataSource")
+                if src_node is not None and inner_text(src_node):
+                    if inner_text(src_node) not in data_source_names:
+                        report_error(f"DataSet '{ds_name}' references unknown dataSource: {inner_text(src_node)}")
+                        ds_ok = False
+
+            # Check query not empty for Query type
+            if xsi_type == "DataSetQuery":
+                query_node = find(ds, "s:query")
+                if query_node is None or not text_of(query_node):
+                    report_warn(f"DataSet '{ds_name}' (Query) has empty query")
+
+            # Check objectName for Object type
+            if xsi_type == "DataSetObject":
+                obj_node = find(ds, "s:objectName")
+                if obj_node is None or not text_of(obj_node):
+                    report_error(f"DataSet '{ds_name}' (Object) has empty objectName")
+                    ds_ok = False
 
-    if ds_ok:
-        report_ok(f"{len(data_set_nodes)} dataSet(s) found, names unique")
+        if ds_ok:
+            report_ok(f"{len(data_set_nodes)} dataSet(s) found, names unique")
 
-if stopped:
-    finalize()
-    sys.exit(1)
 
 # ── 7. Field checks ──────────────────────────────────────────
 
@@ -367,169 +361,159 @@ def check_data_set_fields(ds_node, ds_name):
         check_data_set_fields(item, i_name)
 
 
-for ds in data_set_nodes:
-    name_node = find(ds, "s:name")
-    ds_name = inner_text(name_node) if name_node is not None else "(unnamed)"
-    check_data_set_fields(ds, ds_name)
+def check_fields():
+    for ds in data_set_nodes:
+        name_node = find(ds, "s:name")
+        ds_name = inner_text(name_node) if name_node is not None else "(unnamed)"
+        check_data_set_fields(ds, ds_name)
 
-if stopped:
-    finalize()
-    sys.exit(1)
 
 # ── 8. DataSetLink checks ────────────────────────────────────
 
-link_nodes = find_all(root, "s:dataSetLink")
-if len(link_nodes) > 0:
-    link_ok = True
-    for link in link_nodes:
-        src = find(link, "s:sourceDataSet")
-        dst = find(link, "s:destinationDataSet")
-        src_expr = find(link, "s:sourceExpression")
-        dst_expr = find(link, "s:destinationExpression")
-
-        if src is not None and inner_text(src) and inner_text(src) not in data_set_names:
-            report_error(f"DataSetLink: sourceDataSet '{inner_text(src)}' not found")
-            link_ok = False
-        if dst is not None and inner_text(dst) and inner_text(dst) not in data_set_names:
-            report_error(f"DataSetLink: destinationDataSet '{inner_text(dst)}' not found")
-            link_ok = False
-        if src_expr is None or not text_of(src_expr):
-            report_error("DataSetLink: empty sourceExpression")
-            link_ok = False
-        if dst_expr is None or not text_of(dst_expr):
-            report_error("DataSetLink: empty destinationExpression")
-            link_ok = False
-    if link_ok:
-        report_ok(f"{len(link_nodes)} dataSetLink(s): references valid")
-
-if stopped:
-    finalize()
-    sys.exit(1)
+def check_links():
+    link_nodes = find_all(root, "s:dataSetLink")
+    if len(link_nodes) > 0:
+        link_ok = True
+        for link in link_nodes:
+            src = find(link, "s:sourceDataSet")
+            dst = find(link, "s:destinationDataSet")
+            src_expr = find(link, "s:sourceExpression")
+            dst_expr = find(link, "s:destinationExpression")
+
+            if src is not None and inner_text(src) and inner_text(src) not in data_set_names:
+                report_error(f"DataSetLink: sourceDataSet '{inner_text(src)}' not found")
+                link_ok = False
+            if dst is not None and inner_text(dst) and inner_text(dst) not in data_set_names:
+                report_error(f"DataSetLink: destinationDataSet '{inner_text(dst)}' not found")
+                link_ok = False
+            if src_expr is None or not text_of(src_expr):
+                report_error("DataSetLink: empty sourceExpression")
+                link_ok = False
+            if dst_expr is None or not text_of(dst_expr):
+                report_error("DataSetLink: empty destinationExpression")
+                link_ok = False
+        if link_ok:
+            report_ok(f"{len(link_nodes)} dataSetLink(s): references valid")
+
 
 # ── 9. CalculatedField checks ────────────────────────────────
 
-if len(calc_field_nodes) > 0:
-    cf_ok = True
-    cf_seen = {}
-    for cf in calc_field_nodes:
-        dp = find(cf, "s:dataPath")
-        expr = find(cf, "s:expression")
+def check_calculated_fields():
+    if len(calc_field_nodes) > 0:
+        cf_ok = True
+        cf_seen = {}
+        for cf in calc_field_nodes:
+            dp = find(cf, "s:dataPath")
+            expr = find(cf, "s:expression")
 
-        if dp is None or not inner_text(dp):
-            report_error("CalculatedField has empty dataPath")
-            cf_ok = False
-            continue
+            if dp is None or not inner_text(dp):
+                report_error("CalculatedField has empty dataPath")
+                cf_ok = False
+                continue
 
-        path = inner_text(dp)
-        if path in cf_seen:
-            report_error(f"Duplicate calculatedField dataPath: {path}")
-            cf_ok = False
-        else:
-            cf_seen[path] = True
+            path = inner_text(dp)
+            if path in cf_seen:
+                report_error(f"Duplicate calculatedField dataPath: {path}")
+                cf_ok = False
+            else:
+                cf_seen[path] = True
 
-        if expr is None or not text_of(expr):
-            report_error(f"CalculatedField '{path}' has empty expression")
-            cf_ok = False
+            if expr is None or not text_of(expr):
+                report_error(f"CalculatedField '{path}' has empty expression")
+                cf_ok = False
 
-        # Warn if collides with a dataset field
-        if path in all_field_paths:
-            report_warn(f"CalculatedField '{path}' shadows dataSet field in '{all_field_paths[path]}'")
+            # Warn if collides with a dataset field
+            if path in all_field_paths:
+                report_warn(f"CalculatedField '{path}' shadows dataSet field in '{all_field_paths[path]}'")
 
-    if cf_ok:
-        report_ok(f"{len(calc_field_nodes)} calculatedField(s): dataPath and expression valid")
+        if cf_ok:
+            report_ok(f"{len(calc_field_nodes)} calculatedField(s): dataPath and expression valid")
 
-if stopped:
-    finalize()
-    sys.exit(1)
 
 # ── 10. TotalField checks ────────────────────────────────────
 
-if len(total_field_nodes) > 0:
-    tf_ok = True
-    for tf in total_field_nodes:
-        dp = find(tf, "s:dataPath")
-        expr = find(tf, "s:expression")
+def check_total_fields():
+    if len(total_field_nodes) > 0:
+        tf_ok = True
+        for tf in total_field_nodes:
+            dp = find(tf, "s:dataPath")
+            expr = find(tf, "s:expression")
 
-        if dp is None or not inner_text(dp):
-            report_error("TotalField has empty dataPath")
-            tf_ok = False
-            continue
+            if dp is None or not inner_text(dp):
+                report_error("TotalField has empty dataPath")
+                tf_ok = False
+                continue
 
-        if expr is None or not text_of(expr):
-            report_error(f"TotalField '{inner_text(dp)}' has empty expression")
-            tf_ok = False
+            if expr is None or not text_of(expr):
+                report_error(f"TotalField '{inner_text(dp)}' has empty expression")
+                tf_ok = False
 
-    if tf_ok:
-        report_ok(f"{len(total_field_nodes)} totalField(s): dataPath and expression present")
+        if tf_ok:
+            report_ok(f"{len(total_field_nodes)} totalField(s): dataPath and expression present")
 
-if stopped:
-    finalize()
-    sys.exit(1)
 
 # ── 11. Parameter checks ─────────────────────────────────────
 
-if len(param_nodes) > 0:
-    param_ok = True
-    param_seen = {}
-    for p in param_nodes:
-        name_node = find(p, "s:name")
-        if name_node is None or not inner_text(name_node):
-            report_error("Parameter has empty name")
-            param_ok = False
-            continue
-        p_name = inner_text(name_node)
-        if p_name in param_seen:
-            report_error(f"Duplicate parameter name: {p_name}")
-            param_ok = False
-        else:
-            param_seen[p_name] = True
-    if param_ok:
-        report_ok(f"{len(param_nodes)} parameter(s): names unique")
+def check_parameters():
+    if len(param_nodes) > 0:
+        param_ok = True
+        param_seen = {}
+        for p in param_nodes:
+            name_node = find(p, "s:name")
+            if name_node is None or not inner_text(name_node):
+                report_error("Parameter has empty name")
+                param_ok = False
+                continue
+            p_name = inner_text(name_node)
+            if p_name in param_seen:
+                report_error(f"Duplicate parameter name: {p_name}")
+                param_ok = False
+            else:
+                param_seen[p_name] = True
+        if param_ok:
+            report_ok(f"{len(param_nodes)} parameter(s): names unique")
 
-if stopped:
-    finalize()
-    sys.exit(1)
 
 # ── 12. Template checks ──────────────────────────────────────
 
-if len(template_nodes) > 0:
-    tpl_ok = True
-    tpl_seen = {}
-    for t in template_nodes:
-        name_node = find(t, "s:name")
-        if name_node is None or not inner_text(name_node):
-            report_error("Template has empty name")
-            tpl_ok = False
-            continue
-        t_name = inner_text(name_node)
-        if t_name in tpl_seen:
-            report_error(f"Duplicate template name: {t_name}")
-            tpl_ok = False
-        else:
-            tpl_seen[t_name] = True
-    if tpl_ok:
-        report_ok(f"{len(template_nodes)} template(s): names unique")
+def check_templates():
+    if len(template_nodes) > 0:
+        tpl_ok = True
+        tpl_seen = {}
+        for t in template_nodes:
+            name_node = find(t, "s:name")
+            if name_node is None or not inner_text(name_node):
+                report_error("Template has empty name")
+                tpl_ok = False
+                continue
+            t_name = inner_text(name_node)
+            if t_name in tpl_seen:
+                report_error(f"Duplicate template name: {t_name}")
+                tpl_ok = False
+            else:
+                tpl_seen[t_name] = True
+        if tpl_ok:
+            report_ok(f"{len(template_nodes)} template(s): names unique")
+
 
 # ── 13. GroupTemplate checks ─────────────────────────────────
 
-if len(group_template_nodes) > 0:
-    gt_ok = True
-    valid_tpl_types = ("Header", "Footer", "Overall", "OverallHeader", "OverallFooter")
-    for gt in group_template_nodes:
-        tpl_ref = find(gt, "s:template")
-        tpl_type = find(gt, "s:templateType")
-
-        if tpl_ref is not None and inner_text(tpl_ref) and inner_text(tpl_ref) not in template_names:
-            report_error(f"GroupTemplate references unknown template: {inner_text(tpl_ref)}")
-            gt_ok = False
-        if tpl_type is not None and inner_text(tpl_type) not in valid_tpl_types:
-            report_warn(f"GroupTemplate has unusual templateType: {inner_text(tpl_type)}")
-    if gt_ok:
-        report_ok(f"{len(group_template_nodes)} groupTemplate(s): references valid")
-
-if stopped:
-    finalize()
-    sys.exit(1)
+def check_group_templates():
+    if len(group_template_nodes) > 0:
+        gt_ok = True
+        valid_tpl_types = ("Header", "Footer", "Overall", "OverallHeader", "OverallFooter")
+        for gt in group_template_nodes:
+            tpl_ref = find(gt, "s:template")
+            tpl_type = find(gt, "s:templateType")
+
+            if tpl_ref is not None and inner_text(tpl_ref) and inner_text(tpl_ref) not in template_names:
+                report_error(f"GroupTemplate references unknown template: {inner_text(tpl_ref)}")
+                gt_ok = False
+            if tpl_type is not None and inner_text(tpl_type) not in valid_tpl_types:
+                report_warn(f"GroupTemplate has unusual templateType: {inner_text(tpl_type)}")
+        if gt_ok:
+            report_ok(f"{len(group_template_nodes)} groupTemplate(s): references valid")
+
 
 # ── 14. Settings helper functions ─────────────────────────────
 
@@ -638,34 +622,54 @@ def check_settings(settings_node, variant_name):
 
 # ── 15. SettingsVariant checks ────────────────────────────────
 
-if len(variant_nodes) == 0:
-    report_warn("No settingsVariant elements found")
-else:
-    v_ok = True
-    v_idx = 0
-    for v in variant_nodes:
-        v_idx += 1
-        v_name = find(v, "dcsset:name")
-        if v_name is None or not inner_text(v_name):
-            report_error(f"SettingsVariant #{v_idx} has empty name")
-            v_ok = False
-
-        settings = find(v, "dcsset:settings")
-        if settings is None:
-            report_error(f"SettingsVariant '{inner_text(v_name) if v_name is not None else ''}' has no settings element")
-            v_ok = False
-            continue
-
-        # Check settings internals
-        check_settings(settings, inner_text(v_name) if v_name is not None else "")
+def check_variants():
+    if len(variant_nodes) == 0:
+        report_warn("No settingsVariant elements found")
+    else:
+        v_ok = True
+        v_idx = 0
+        for v in variant_nodes:
+            v_idx += 1
+            v_name = find(v, "dcsset:name")
+            if v_name is None or not inner_text(v_name):
+                report_error(f"SettingsVariant #{v_idx} has empty name")
+                v_ok = False
+
+            settings = find(v, "dcsset:settings")
+            if settings is None:
+                report_error(f"SettingsVariant '{inner_text(v_name) if v_name is not None else ''}' has no settings element")
+                v_ok = False
+                continue
+
+            # Check settings internals
+            check_settings(settings, inner_text(v_name) if v_name is not None else "")
+
+        if v_ok:
+            report_ok(f"{len(variant_nodes)} settingsVariant(s) found")
+
+
+# ── Run checks ────────────────────────────────────────────────
+
+sections = (
+    check_root,
+    check_data_sources,
+    check_data_sets,
+    check_fields,
+    check_links,
+    check_calculated_fields,
+    check_total_fields,
+    check_parameters,
+    check_templates,
+    check_group_templates,
+    check_variants,
+)
 
-    if v_ok:
-        report_ok(f"{len(variant_nodes)} settingsVariant(s) found")
+for section in sections:
+    section()
+    if stopped:
+        break
 
 # ── Final output ──────────────────────────────────────────────
 
 finalize()
-
-if errors > 0:
-    sys.exit(1)
-sys.exit(0)
+sys.exit(1 if errors else 0)
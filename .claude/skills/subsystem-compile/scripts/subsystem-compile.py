@@ -2,28 +2,37 @@
 # subsystem-compile v1.0 — Create 1C subsystem from JSON definition
 # Source: https://github.com/Nikolay-Shirokov/cc-1c-skills
 import argparse
-import json
 import os
 import re
+import subprocess
 import sys
 import uuid
-import xml.etree.ElementTree as ET
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+
+_ESC_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
 
 
 def esc_xml(s):
-    return s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+    return s.translate(_ESC_TABLE)
 
 
 def emit_mltext(lines, indent, tag, text):
     if not text:
         lines.append(f"{indent}<{tag}/>")
         return
-    lines.append(f"{indent}<{tag}>")
-    lines.append(f"{indent}\t<v8:item>")
-    lines.append(f"{indent}\t\t<v8:lang>ru</v8:lang>")
-    lines.append(f"{indent}\t\t<v8:content>{esc_xml(text)}</v8:content>")
-    lines.append(f"{indent}\t</v8:item>")
-    lines.append(f"{indent}</{tag}>")
+    lines.extend((
+        f"{indent}<{tag}>",
+        f"{indent}\t<v8:item>",
+        f"{indent}\t\t<v8:lang>ru</v8:lang>",
+        f"{indent}\t\t<v8:content>{esc_xml(text)}</v8:content>",
+        f"{indent}\t</v8:item>",
+        f"{indent}</{tag}>",
+    ))
 
 
 def new_uuid():
@@ -35,10 +44,13 @@ def write_utf8_bom(path, content):
         f.write(content)
 
 
+CAMEL_PATTERN = re.compile(r'([a-z\u0430-\u044f\u0451])([A-Z\u0410-\u042f\u0401])')
+
+
 def split_camel_case(name):
     if not name:
         return name
-    result = re.sub(r'([a-z\u0430-\u044f\u0451])([A-Z\u0410-\u042f\u0401])', r'\1 \2', name)
+    result = CAMEL_PATTERN.sub(r'\1 \2', name)
     if len(result) > 1:
         result = result[0] + result[1:].lower()
     return result
@@ -75,7 +87,7 @@ def main():
     else:
         json_text = args.Value
 
-    defn = json.loads(json_text)
+    defn = json_loads(json_text)
 
     if not defn.get('name'):
         print("JSON must have 'name' field", file=sys.stderr)
@@ -109,15 +121,14 @@ def main():
 
     # --- 3. Build XML ---
     uid = new_uuid()
-    lines = []
-
-    lines.append('<?xml version="1.0" encoding="UTF-8"?>')
-    lines.append('<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:app="http://v8.1c.ru/8.2/managed-application/core" xmlns:cfg="http://v8.1c.ru/8.1/data/enterprise/current-config" xmlns:cmi="http://v8.1c.ru/8.2/managed-application/cmi" xmlns:ent="http://v8.1c.ru/8.1/data/enterprise" xmlns:lf="http://v8.1c.ru/8.2/managed-application/logform" xmlns:style="http://v8.1c.ru/8.1/data/ui/style" xmlns:sys="http://v8.1c.ru/8.1/data/ui/fonts/system" xmlns:v8="http://v8.1c.ru/8.1/data/core" xmlns:v8ui="http://v8.1c.ru/8.1/data/ui" xmlns:web="http://v8.1c.ru/8.1/data/ui/colors/web" xmlns:win="http://v8.1c.ru/8.1/data/ui/colors/windows" xmlns:xen="http://v8.1c.ru/8.3/xcf/enums" xmlns:xpr="http://v8.1c.ru/8.3/xcf/predef" xmlns:xr="http://v8.1c.ru/8.3/xcf/readable" xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" version="2.17">')
-    lines.append(f'\t<Subsystem uuid="{uid}">')
-    lines.append('\t\t<Properties>')
-
-    # Name
-    lines.append(f'\t\t\t<Name>{esc_xml(obj_name)}</Name>')
+    obj_name_esc = esc_xml(obj_name)
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:app="http://v8.1c.ru/8.2/managed-application/core" xmlns:cfg="http://v8.1c.ru/8.1/data/enterprise/current-config" xmlns:cmi="http://v8.1c.ru/8.2/managed-application/cmi" xmlns:ent="http://v8.1c.ru/8.1/data/enterprise" xmlns:lf="http://v8.1c.ru/8.2/managed-application/logform" xmlns:style="http://v8.1c.ru/8.1/data/ui/style" xmlns:sys="http://v8.1c.ru/8.1/data/ui/fonts/system" xmlns:v8="http://v8.1c.ru/8.1/data/core" xmlns:v8ui="http://v8.1c.ru/8.1/data/ui" xmlns:web="http://v8.1c.ru/8.1/data/ui/colors/web" xmlns:win="http://v8.1c.ru/8.1/data/ui/colors/windows" xmlns:xen="http://v8.1c.ru/8.3/xcf/enums" xmlns:xpr="http://v8.1c.ru/8.3/xcf/predef" xmlns:xr="http://v8.1c.ru/8.3/xcf/readable" xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" version="2.17">',
+        f'\t<Subsystem uuid="{uid}">',
+        '\t\t<Properties>',
+        f'\t\t\t<Name>{obj_name_esc}</Name>',
+    ]
 
     # Synonym
     emit_mltext(lines, '\t\t\t', 'Synonym', synonym)
@@ -129,44 +140,41 @@ def main():
         lines.append('\t\t\t<Comment/>')
 
     # Boolean properties
-    lines.append(f'\t\t\t<IncludeHelpInContents>{include_help_in_contents}</IncludeHelpInContents>')
-    lines.append(f'\t\t\t<IncludeInCommandInterface>{include_in_ci}</IncludeInCommandInterface>')
-    lines.append(f'\t\t\t<UseOneCommand>{use_one_command}</UseOneCommand>')
+    lines.extend((
+        f'\t\t\t<IncludeHelpInContents>{include_help_in_contents}</IncludeHelpInContents>',
+        f'\t\t\t<IncludeInCommandInterface>{include_in_ci}</IncludeInCommandInterface>',
+        f'\t\t\t<UseOneCommand>{use_one_command}</UseOneCommand>',
+    ))
 
     # Explanation
     emit_mltext(lines, '\t\t\t', 'Explanation', explanation)
 
     # Picture
     if picture:
-        lines.append('\t\t\t<Picture>')
-        lines.append(f'\t\t\t\t<xr:Ref>{picture}</xr:Ref>')
-        lines.append('\t\t\t\t<xr:LoadTransparent>false</xr:LoadTransparent>')
-        lines.append('\t\t\t</Picture>')
+        lines.extend((
+            '\t\t\t<Picture>',
+            f'\t\t\t\t<xr:Ref>{picture}</xr:Ref>',
+            '\t\t\t\t<xr:LoadTransparent>false</xr:LoadTransparent>',
+            '\t\t\t</Picture>',
+        ))
     else:
         lines.append('\t\t\t<Picture/>')
 
     # Content
     if len(content_items) > 0:
         lines.append('\t\t\t<Content>')
-        for item in content_items:
-            lines.append(f'\t\t\t\t<xr:Item xsi:type="xr:MDObjectRef">{esc_xml(item)}</xr:Item>')
+        lines.extend(f'\t\t\t\t<xr:Item xsi:type="xr:MDObjectRef">{esc_xml(item)}</xr:Item>' for item in content_items)
         lines.append('\t\t\t</Content>')
     else:
         lines.append('\t\t\t<Content/>')
 
-    lines.append('\t\t</Properties>')
-
     # ChildObjects
     if len(children) > 0:
-        lines.append('\t\t<ChildObjects>')
-        for ch in children:
-            lines.append(f'\t\t\t<Subsystem>{esc_xml(ch)}</Subsystem>')
-        lines.append('\t\t</ChildObjects>')
+        lines.extend(('\t\t</Properties>', '\t\t<ChildObjects>'))
+        lines.extend(f'\t\t\t<Subsystem>{esc_xml(ch)}</Subsystem>' for ch in children)
+        lines.extend(('\t\t</ChildObjects>', '\t</Subsystem>', '</MetaDataObject>'))
     else:
-        lines.append('\t\t<ChildObjects/>')
-
-    lines.append('\t</Subsystem>')
-    lines.append('</MetaDataObject>')
+        lines.extend(('\t\t</Properties>', '\t\t<ChildObjects/>', '\t</Subsystem>', '</MetaDataObject>'))
 
     # --- 4. Write files ---
     parent = args.Parent
@@ -190,8 +198,10 @@ def main():
     target_xml = os.path.join(subs_dir, f'{obj_name}.xml')
 
     # Write XML
-    xml_content = '\n'.join(lines) + '\n'
-    write_utf8_bom(target_xml, xml_content)
+    with open(target_xml, 'wb') as f:
+        f.write(b'\xef\xbb\xbf')
+        f.write('\n'.join(lines).encode('utf-8'))
+        f.write(b'\n')
     print(f"[OK] Created: {target_xml}")
 
     # Create subdirectory if children exist
@@ -211,67 +221,56 @@ def main():
             parent_xml_path = config_xml
 
     if parent_xml_path and os.path.exists(parent_xml_path):
+        # Check if already registered: a line scan of the <ChildObjects> span avoids loading the whole file
+        reg_line = f'<Subsystem>{obj_name_esc}</Subsystem>'
+        already_exists = False
+        in_child_objects = False
         with open(parent_xml_path, 'r', encoding='utf-8-sig') as f:
-            raw_text = f.read()
-
-        doc = ET.ElementTree(ET.fromstring(raw_text))
-        root = doc.getroot()
-        md_ns = 'http://v8.1c.ru/8.3/MDClasses'
-
-        # Find ChildObjects
-        child_objects = None
-        if parent:
-            for sub in root.iter(f'{{{md_ns}}}Subsystem'):
-                child_objects = sub.find(f'{{{md_ns}}}ChildObjects')
-                break
-        else:
-            for cfg in root.iter(f'{{{md_ns}}}Configuration'):
-                child_objects = cfg.find(f'{{{md_ns}}}ChildObjects')
-                break
-
-        if child_objects is not None:
-            # Check if already registered
-            already_exists = False
-            for child in child_objects:
-                if child.tag == f'{{{md_ns}}}Subsystem' and child.text == obj_name:
+            for line in f:
+                if not in_child_objects:
+                    start = line.find('<ChildObjects>')
+                    if start < 0:
+                        continue
+                    in_child_objects = True
+                    line = line[start:]
+                end = line.find('</ChildObjects>')
+                if reg_line in (line if end < 0 else line[:end]):
                     already_exists = True
                     break
+                if end >= 0:
+                    break
 
-            if not already_exists:
-                new_el = ET.SubElement(child_objects, f'{{{md_ns}}}Subsystem')
-                new_el.text = obj_name
-
-                # Re-serialize with whitespace preservation via raw text manipulation instead
-                # Since ElementTree doesn't preserve whitespace well, use regex-based insertion
-                # Find </ChildObjects> or <ChildObjects/> and inject
-                pass  # Fall through to raw text approach below
-
-            if not already_exists:
-                # Use raw text manipulation to preserve formatting
-                if '<ChildObjects/>' in raw_text:
-                    replacement = f'<ChildObjects>\n\t\t\t<Subsystem>{esc_xml(obj_name)}</Subsystem>\n\t\t</ChildObjects>'
-                    raw_text = raw_text.replace('<ChildObjects/>', replacement, 1)
-                elif '</ChildObjects>' in raw_text:
-                    insert_line = f'\t\t\t<Subsystem>{esc_xml(obj_name)}</Subsystem>\n'
-                    raw_text = raw_text.replace('</ChildObjects>', insert_line + '\t\t</ChildObjects>', 1)
-
+        if already_exists:
+            print(f"[SKIP] Already registered in: {parent_xml_path}")
+        else:
+            with open(parent_xml_path, 'r', encoding='utf-8-sig') as f:
+                raw_text = f.read()
+
+            # Use raw text manipulation to preserve formatting
+            co_start = raw_text.find('<ChildObjects/>')
+            co_end = raw_text.find('</ChildObjects>') if co_start < 0 else -1
+            if co_start >= 0:
+                replacement = f'<ChildObjects>\n\t\t\t{reg_line}\n\t\t</ChildObjects>'
+                raw_text = raw_text[:co_start] + replacement + raw_text[co_start + len('<ChildObjects/>'):]
+            elif co_end >= 0:
+                raw_text = raw_text[:co_end] + f'\t\t\t{reg_line}\n\t\t' + raw_text[co_end:]
+
+            if co_start >= 0 or co_end >= 0:
                 write_utf8_bom(parent_xml_path, raw_text)
                 print(f"[OK] Registered in: {parent_xml_path}")
             else:
-                print(f"[SKIP] Already registered in: {parent_xml_path}")
-        else:
-            print(f"[WARN] ChildObjects not found in: {parent_xml_path}")
+                print(f"[WARN] ChildObjects not found in: {parent_xml_path}")
     else:
         print("[INFO] No parent XML to register in")
 
     # --- 6. Auto-validate ---
     if not args.NoValidate:
         script_dir = os.path.dirname(os.path.abspath(__file__))
-        validate_script = os.path.normpath(os.path.join(script_dir, '..', '..', 'subsystem-validate', 'scripts', 'subsystem-validate.ps1'))
+        validate_script = os.path.normpath(os.path.join(script_dir, '..', '..', 'subsystem-validate', 'scripts', 'subsystem-validate.py'))
         if os.path.exists(validate_script):
             print()
             print("--- Running subsystem-validate ---")
-            os.system(f'powershell.exe -NoProfile -File "{validate_script}" -SubsystemPath "{target_xml}"')
+            subprocess.run([sys.executable, validate_script, '-SubsystemPath', target_xml])
 
     # --- 7. Summary ---
     print()
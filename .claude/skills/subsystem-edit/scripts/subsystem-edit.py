@@ -3,12 +3,16 @@
 # Source: https://github.com/Nikolay-Shirokov/cc-1c-skills
 
 import argparse
-import json
 import os
 import subprocess
 import sys
 from lxml import etree
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 MD_NS = "http://v8.1c.ru/8.3/MDClasses"
 XR_NS = "http://v8.1c.ru/8.3/xcf/readable"
 XSI_NS = "http://www.w3.org/2001/XMLSchema-instance"
@@ -24,8 +28,19 @@ NSMAP_WRAPPER = {
 }
 
 
-def localname(el):
-    return etree.QName(el.tag).localname
+TAG_SUBSYSTEM = f"{{{MD_NS}}}Subsystem"
+TAG_PROPERTIES = f"{{{MD_NS}}}Properties"
+TAG_CHILD_OBJECTS = f"{{{MD_NS}}}ChildObjects"
+TAG_NAME = f"{{{MD_NS}}}Name"
+TAG_CONTENT = f"{{{MD_NS}}}Content"
+TAG_ITEM = f"{{{XR_NS}}}Item"
+
+BOOL_PROPS = frozenset(("IncludeInCommandInterface", "UseOneCommand", "IncludeHelpInContents"))
+ML_PROPS = frozenset(("Synonym", "Explanation"))
+
+
+def esc_xml(s):
+    return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
 
 
 def info(msg):
@@ -98,34 +113,32 @@ def expand_self_closing(container, parent_indent):
         container.text = "\r\n" + parent_indent
 
 
-def import_fragment(xml_string, doc_root):
-    """Parse an XML fragment in the MD namespace context and return elements."""
-    wrapper = (
-        f'<_W xmlns="{MD_NS}" xmlns:xsi="{XSI_NS}" xmlns:v8="{V8_NS}" '
-        f'xmlns:xr="{XR_NS}" xmlns:xs="{XS_NS}">{xml_string}</_W>'
-    )
-    frag = etree.fromstring(wrapper.encode("utf-8"))
-    nodes = []
-    for child in frag:
-        nodes.append(child)
-    return nodes
+FRAGMENT_OPEN = (
+    f'<_W xmlns="{MD_NS}" xmlns:xsi="{XSI_NS}" xmlns:v8="{V8_NS}" '
+    f'xmlns:xr="{XR_NS}" xmlns:xs="{XS_NS}">'
+).encode("utf-8")
+
+
+def import_fragment(xml_bytes, doc_root):
+    """Parse a UTF-8 encoded XML fragment in the MD namespace context and return elements."""
+    frag = etree.fromstring(FRAGMENT_OPEN + xml_bytes + b"</_W>")
+    return list(frag)
 
 
 def parse_value_list(val):
     """Parse a string or JSON array into a list of strings."""
     val = val.strip()
     if val.startswith("["):
-        arr = json.loads(val)
-        return [str(item) for item in arr]
+        arr = json_loads(val)
+        return [str(item).strip() for item in arr]
     return [val]
 
 
 def save_xml_bom(tree, path):
-    xml_bytes = etree.tostring(tree, xml_declaration=True, encoding="UTF-8")
-    xml_bytes = xml_bytes.replace(b"encoding='UTF-8'", b'encoding="UTF-8"')
+    # lxml quotes its own declaration with apostrophes; 1C expects double quotes
     with open(path, "wb") as f:
-        f.write(b"\xef\xbb\xbf")
-        f.write(xml_bytes)
+        f.write(b'\xef\xbb\xbf<?xml version="1.0" encoding="UTF-8"?>\n')
+        tree.write(f, encoding="UTF-8", xml_declaration=False)
 
 
 def main():
@@ -188,88 +201,83 @@ def main():
     modify_count = 0
 
     # --- Detect structure ---
-    sub = None
-    for child in xml_root:
-        if isinstance(child.tag, str) and localname(child) == "Subsystem":
-            sub = child
-            break
+    sub = xml_root.find(TAG_SUBSYSTEM)
     if sub is None:
         print("No <Subsystem> element found", file=sys.stderr)
         sys.exit(1)
 
-    props_el = None
-    child_objs_el = None
-    for child in sub:
-        if not isinstance(child.tag, str):
-            continue
-        if localname(child) == "Properties":
-            props_el = child
-        if localname(child) == "ChildObjects":
-            child_objs_el = child
+    props_el = sub.find(TAG_PROPERTIES)
+    child_objs_el = sub.find(TAG_CHILD_OBJECTS)
 
     obj_name = ""
+    content_el = None
     if props_el is not None:
-        for child in props_el:
-            if isinstance(child.tag, str) and localname(child) == "Name":
-                obj_name = (child.text or "").strip()
-                break
+        name_el = props_el.find(TAG_NAME)
+        if name_el is not None:
+            obj_name = (name_el.text or "").strip()
+        content_el = props_el.find(TAG_CONTENT)
     info(f"Subsystem: {obj_name}")
 
+    # Containers keep their indentation while children are appended,
+    # so detect it once per container; removals drop the cached value.
+    indent_cache = {}
+
+    def child_indent(container):
+        indent = indent_cache.get(container)
+        if indent is None:
+            indent = indent_cache[container] = get_child_indent(container)
+        return indent
+
     # --- Operations ---
     def do_add_content(items):
         nonlocal add_count
-        content_el = None
-        for child in props_el:
-            if isinstance(child.tag, str) and localname(child) == "Content":
-                content_el = child
-                break
         if content_el is None:
             print("No <Content> element found", file=sys.stderr)
             sys.exit(1)
 
-        existing = set()
-        for child in content_el:
-            if isinstance(child.tag, str) and localname(child) == "Item":
-                existing.add((child.text or "").strip())
+        existing = {(child.text or "").strip() for child in content_el.iterchildren(TAG_ITEM)}
 
-        props_indent = get_child_indent(props_el)
+        props_indent = child_indent(props_el)
         if len(content_el) == 0 and not (content_el.text and content_el.text.strip()):
             expand_self_closing(content_el, props_indent)
-        content_indent = get_child_indent(content_el)
+        content_indent = child_indent(content_el)
 
+        new_items = []
         for item in items:
             if item in existing:
                 warn(f"Content already contains: {item}")
                 continue
-            frag_xml = f'<xr:Item xsi:type="xr:MDObjectRef">{item}</xr:Item>'
-            nodes = import_fragment(frag_xml, xml_root)
-            if nodes:
-                insert_before_closing(content_el, nodes[0], content_indent)
-                add_count += 1
-                info(f"Added content: {item}")
+            existing.add(item)
+            new_items.append(item)
+        if not new_items:
+            return
+
+        frag_xml = "".join(f'<xr:Item xsi:type="xr:MDObjectRef">{esc_xml(item)}</xr:Item>' for item in new_items).encode("utf-8")
+        nodes = import_fragment(frag_xml, xml_root)
+        for item, node in zip(new_items, nodes):
+            insert_before_closing(content_el, node, content_indent)
+            add_count += 1
+            info(f"Added content: {item}")
 
     def do_remove_content(items):
         nonlocal remove_count
-        content_el = None
-        for child in props_el:
-            if isinstance(child.tag, str) and localname(child) == "Content":
-                content_el = child
-                break
         if content_el is None:
             print("No <Content> element found", file=sys.stderr)
             sys.exit(1)
 
+        existing = {}
+        for child in content_el.iterchildren(TAG_ITEM):
+            existing.setdefault((child.text or "").strip(), []).append(child)
+
         for item in items:
-            found = False
-            for child in list(content_el):
-                if isinstance(child.tag, str) and localname(child) == "Item" and (child.text or "").strip() == item:
-                    remove_with_indent(child)
-                    remove_count += 1
-                    info(f"Removed content: {item}")
-                    found = True
-                    break
-            if not found:
+            matches = existing.get(item)
+            if not matches:
                 warn(f"Content item not found: {item}")
+                continue
+            remove_with_indent(matches.pop(0))
+            indent_cache.pop(content_el, None)
+            remove_count += 1
+            info(f"Removed content: {item}")
 
     def do_add_child(child_name):
         nonlocal add_count
@@ -277,20 +285,17 @@ def main():
             print("No <ChildObjects> element found", file=sys.stderr)
             sys.exit(1)
 
-        for child in child_objs_el:
-            if isinstance(child.tag, str) and localname(child) == "Subsystem" and (child.text or "").strip() == child_name:
+        for child in child_objs_el.iterchildren(TAG_SUBSYSTEM):
+            if (child.text or "").strip() == child_name:
                 warn(f"ChildObjects already contains: {child_name}")
                 return
 
-        sub_indent = get_child_indent(sub)
+        sub_indent = child_indent(sub)
         if len(child_objs_el) == 0 and not (child_objs_el.text and child_objs_el.text.strip()):
             expand_self_closing(child_objs_el, sub_indent)
-        ci = get_child_indent(child_objs_el)
+        ci = child_indent(child_objs_el)
 
-        new_el = etree.SubElement(child_objs_el, f"{{{MD_NS}}}Subsystem")
-        # Actually we need to use insert_before_closing pattern
-        child_objs_el.remove(new_el)
-        new_el = etree.Element(f"{{{MD_NS}}}Subsystem")
+        new_el = etree.Element(TAG_SUBSYSTEM)
         new_el.text = child_name
         insert_before_closing(child_objs_el, new_el, ci)
         add_count += 1
@@ -303,9 +308,10 @@ def main():
             sys.exit(1)
 
         found = False
-        for child in list(child_objs_el):
-            if isinstance(child.tag, str) and localname(child) == "Subsystem" and (child.text or "").strip() == child_name:
+        for child in child_objs_el.iterchildren(TAG_SUBSYSTEM):
+            if (child.text or "").strip() == child_name:
                 remove_with_indent(child)
+                indent_cache.pop(child_objs_el, None)
                 remove_count += 1
                 info(f"Removed child subsystem: {child_name}")
                 found = True
@@ -315,21 +321,16 @@ def main():
 
     def do_set_property(json_val):
         nonlocal modify_count
-        prop_def = json.loads(json_val)
+        prop_def = json_loads(json_val)
         prop_name = str(prop_def["name"])
         prop_value = str(prop_def.get("value", ""))
 
-        prop_el = None
-        for child in props_el:
-            if isinstance(child.tag, str) and localname(child) == prop_name:
-                prop_el = child
-                break
+        prop_el = props_el.find(f"{{{MD_NS}}}{prop_name}")
         if prop_el is None:
             print(f"Property '{prop_name}' not found in Properties", file=sys.stderr)
             sys.exit(1)
 
-        bool_props = ["IncludeInCommandInterface", "UseOneCommand", "IncludeHelpInContents"]
-        if prop_name in bool_props:
+        if prop_name in BOOL_PROPS:
             prop_el.text = prop_value.lower()
             # Clear children
             for ch in list(prop_el):
@@ -338,8 +339,7 @@ def main():
             info(f"Set {prop_name} = {prop_value}")
             return
 
-        ml_props = ["Synonym", "Explanation"]
-        if prop_name in ml_props:
+        if prop_name in ML_PROPS:
             if not prop_value:
                 # Clear - make self-closing
                 for ch in list(prop_el):
@@ -348,22 +348,16 @@ def main():
                 modify_count += 1
                 info(f"Cleared {prop_name}")
             else:
-                for ch in list(prop_el):
-                    prop_el.remove(ch)
-                indent = get_child_indent(props_el)
-
-                item_el = etree.SubElement(prop_el, f"{{{V8_NS}}}item")
-                lang_el = etree.SubElement(item_el, f"{{{V8_NS}}}lang")
-                lang_el.text = "ru"
-                content_el = etree.SubElement(item_el, f"{{{V8_NS}}}content")
-                content_el.text = prop_value
-
-                # Set whitespace
-                prop_el.text = "\r\n" + indent + "\t"
-                item_el.text = "\r\n" + indent + "\t\t"
-                lang_el.tail = "\r\n" + indent + "\t\t"
-                content_el.tail = "\r\n" + indent + "\t"
-                item_el.tail = "\r\n" + indent
+                indent = child_indent(props_el)
+                frag_xml = (
+                    f"<{prop_name}>\n{indent}\t<v8:item>"
+                    f"\n{indent}\t\t<v8:lang>ru</v8:lang>"
+                    f"\n{indent}\t\t<v8:content>{esc_xml(prop_value)}</v8:content>"
+                    f"\n{indent}\t</v8:item>\n{indent}</{prop_name}>"
+                ).encode("utf-8")
+                new_el = import_fragment(frag_xml, xml_root)[0]
+                new_el.tail = prop_el.tail
+                props_el.replace(prop_el, new_el)
 
                 modify_count += 1
                 info(f'Set {prop_name} = "{prop_value}"')
@@ -386,7 +380,7 @@ def main():
             if not prop_value:
                 prop_el.text = None
             else:
-                indent = get_child_indent(props_el)
+                indent = child_indent(props_el)
                 ref_el = etree.SubElement(prop_el, f"{{{XR_NS}}}Ref")
                 ref_el.text = prop_value
                 load_el = etree.SubElement(prop_el, f"{{{XR_NS}}}LoadTransparent")
@@ -412,7 +406,7 @@ def main():
         if not os.path.isabs(def_file):
             def_file = os.path.join(os.getcwd(), def_file)
         with open(def_file, "r", encoding="utf-8-sig") as fh:
-            ops = json.loads(fh.read())
+            ops = json_loads(fh.read())
         if isinstance(ops, list):
             operations = ops
         else:
@@ -439,8 +433,11 @@ def main():
             sys.exit(1)
 
     # --- Save ---
-    save_xml_bom(tree, resolved_path)
-    info(f"Saved: {resolved_path}")
+    if add_count or remove_count or modify_count:
+        save_xml_bom(tree, resolved_path)
+        info(f"Saved: {resolved_path}")
+    else:
+        info("No changes; file unchanged")
 
     # --- Auto-validate ---
     if not args.NoValidate:
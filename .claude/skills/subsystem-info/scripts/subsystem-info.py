@@ -3,14 +3,16 @@
 # Source: https://github.com/Nikolay-Shirokov/cc-1c-skills
 
 import argparse
+import functools
 import os
 import re
 import sys
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from lxml import etree
 
 sys.stdout.reconfigure(encoding="utf-8")
-    sys.stderr.reconfigure(encoding="utf-8")
+sys.stderr.reconfigure(encoding="utf-8")
 
 # --- Argument parsing ---
 parser = argparse.ArgumentParser(description="Analyze 1C subsystem structure", allow_abbrev=False)
@@ -45,43 +47,83 @@ CI_NS = {
     "xr": "http://v8.1c.ru/8.3/xcf/readable",
 }
 
+# --- Shared read-only parser: no entity expansion or network access, blank text dropped ---
+XML_PARSER = etree.XMLParser(remove_blank_text=True, resolve_entities=False, no_network=True,
+                             huge_tree=True, collect_ids=False)
+
+# --- Precompiled XPath expressions ---
+XP_CONTENT_ITEMS = etree.XPath("md:Content/xr:Item", namespaces=NS)
+
+# --- Clark-notation tags for direct comparison with element.tag (interned once) ---
+def clark(ns_uri, name):
+    return sys.intern(f"{{{ns_uri}}}{name}")
+
+TAG_SUBSYSTEM = clark(NS["md"], "Subsystem")
+TAG_PROPERTIES = clark(NS["md"], "Properties")
+TAG_CHILD_OBJECTS = clark(NS["md"], "ChildObjects")
+TAG_NAME = clark(NS["md"], "Name")
+TAG_SYNONYM = clark(NS["md"], "Synonym")
+TAG_COMMENT = clark(NS["md"], "Comment")
+TAG_INCLUDE_IN_CI = clark(NS["md"], "IncludeInCommandInterface")
+TAG_USE_ONE_COMMAND = clark(NS["md"], "UseOneCommand")
+TAG_EXPLANATION = clark(NS["md"], "Explanation")
+TAG_PICTURE = clark(NS["md"], "Picture")
+TAG_PICTURE_REF = clark(NS["xr"], "Ref")
+TAG_LANG = clark(NS["v8"], "lang")
+TAG_CONTENT = clark(NS["v8"], "content")
+
+TAG_CI_COMMANDS_VISIBILITY = clark(CI_NS["ci"], "CommandsVisibility")
+TAG_CI_COMMANDS_PLACEMENT = clark(CI_NS["ci"], "CommandsPlacement")
+TAG_CI_COMMANDS_ORDER = clark(CI_NS["ci"], "CommandsOrder")
+TAG_CI_SUBSYSTEMS_ORDER = clark(CI_NS["ci"], "SubsystemsOrder")
+TAG_CI_GROUPS_ORDER = clark(CI_NS["ci"], "GroupsOrder")
+TAG_CI_COMMAND = clark(CI_NS["ci"], "Command")
+TAG_CI_SUBSYSTEM = clark(CI_NS["ci"], "Subsystem")
+TAG_CI_GROUP = clark(CI_NS["ci"], "Group")
+TAG_CI_VISIBILITY = clark(CI_NS["ci"], "Visibility")
+TAG_CI_COMMAND_GROUP = clark(CI_NS["ci"], "CommandGroup")
+TAG_CI_PLACEMENT = clark(CI_NS["ci"], "Placement")
+TAG_XR_COMMON = clark(CI_NS["xr"], "Common")
+
+# CommandInterface section -> tag of its item elements
+CI_SECTION_ITEMS = {
+    TAG_CI_COMMANDS_VISIBILITY: TAG_CI_COMMAND,
+    TAG_CI_COMMANDS_PLACEMENT: TAG_CI_COMMAND,
+    TAG_CI_COMMANDS_ORDER: TAG_CI_COMMAND,
+    TAG_CI_SUBSYSTEMS_ORDER: TAG_CI_SUBSYSTEM,
+    TAG_CI_GROUPS_ORDER: TAG_CI_GROUP,
+}
+
+def first_child(parent, tag):
+    return next(parent.iterchildren(tag), None)
+
 # --- Helper: get LocalString text ---
 def get_ml_text(node):
     if node is None:
         return ""
     # Look for v8:item children
     for item in node:
-        if not isinstance(item.tag, str):
-            continue
         lang = ""
         content = ""
         for c in item:
-            if not isinstance(c.tag, str):
-                continue
-            local = etree.QName(c.tag).localname
-            if local == "lang":
+            if c.tag == TAG_LANG:
                 lang = c.text or ""
-            if local == "content":
+            elif c.tag == TAG_CONTENT:
                 content = c.text or ""
         if lang == "ru" and content:
             return content
     # fallback: first item
     for item in node:
-        if not isinstance(item.tag, str):
-            continue
         for c in item:
-            if not isinstance(c.tag, str):
-                continue
-            local = etree.QName(c.tag).localname
-            if local == "content" and c.text:
+            if c.tag == TAG_CONTENT and c.text:
                 return c.text
     return ""
 
 # --- Helper: load subsystem XML ---
 def load_subsystem_xml(xml_path):
-    tree = etree.parse(xml_path, etree.XMLParser(remove_blank_text=False))
+    tree = etree.parse(xml_path, XML_PARSER)
     doc_root = tree.getroot()
-    sub = doc_root.find("md:Subsystem", NS)
+    sub = first_child(doc_root, TAG_SUBSYSTEM)
     if sub is None:
         print(f"[ERROR] Not a valid subsystem XML: {xml_path}", file=sys.stderr)
         sys.exit(1)
@@ -90,10 +132,7 @@ def load_subsystem_xml(xml_path):
 # --- Helper: get content items ---
 def get_content_items(props):
     items = []
-    content_node = props.find("md:Content", NS)
-    if content_node is None:
-        return items
-    for item in content_node.findall("xr:Item", NS):
+    for item in XP_CONTENT_ITEMS(props):
         if item.text:
             items.append(item.text)
     return items
@@ -101,33 +140,52 @@ def get_content_items(props):
 # --- Helper: get child subsystem names ---
 def get_child_names(sub):
     names = []
-    co = sub.find("md:ChildObjects", NS)
+    co = first_child(sub, TAG_CHILD_OBJECTS)
     if co is None:
         return names
     for child in co:
-        if not isinstance(child.tag, str):
-            continue
-        if etree.QName(child.tag).localname == "Subsystem":
+        if child.tag == TAG_SUBSYSTEM:
             names.append(child.text or "")
     return names
 
+# --- Helper: streaming parse of the fields tree mode needs (None if not a subsystem) ---
+def load_tree_summary(xml_path):
+    summary = None
+    child_names = []
+    for _, elem in etree.iterparse(xml_path, events=("end",), tag=(TAG_PROPERTIES, TAG_CHILD_OBJECTS),
+                                   remove_blank_text=True, resolve_entities=False, no_network=True,
+                                   huge_tree=True, collect_ids=False):
+        if elem.getparent().tag != TAG_SUBSYSTEM:
+            continue
+        if elem.tag == TAG_PROPERTIES:
+            name_node = first_child(elem, TAG_NAME)
+            use_one = first_child(elem, TAG_USE_ONE_COMMAND)
+            incl_ci_node = first_child(elem, TAG_INCLUDE_IN_CI)
+            summary = {
+                "Name": name_node.text if name_node is not None else "",
+                "UseOneCommand": use_one.text if use_one is not None else "",
+                "IncludeInCommandInterface": incl_ci_node.text if incl_ci_node is not None else "",
+                "ContentCount": len(get_content_items(elem)),
+            }
+        else:
+            child_names = get_child_names(elem.getparent())
+        elem.clear()
+    if summary is None:
+        return None
+    summary["ChildNames"] = child_names
+    return summary
+
 # --- Helper: group content by type ---
+UUID_PREFIX_PATTERN = re.compile(r'[0-9a-fA-F]{8}-')
+
 def group_content_by_type(items):
     groups = OrderedDict()
     for item in items:
-        m = re.match(r'^([^.]+)\.(.+)$', item)
-        if m:
-            type_name = m.group(1)
-            name = m.group(2)
-        elif re.match(r'^[0-9a-fA-F]{8}-', item):
-            type_name = "[UUID]"
-            name = item
-        else:
-            type_name = "[Other]"
+        type_name, _, name = item.partition(".")
+        if not (type_name and name):
+            type_name = "[UUID]" if UUID_PREFIX_PATTERN.match(item) else "[Other]"
             name = item
-        if type_name not in groups:
-            groups[type_name] = []
-        groups[type_name].append(name)
+        groups.setdefault(type_name, []).append(name)
     return groups
 
 # --- Helper: find subsystem dir from XML path ---
@@ -136,6 +194,75 @@ def get_subsystem_dir(xml_path):
     base_name = os.path.splitext(os.path.basename(xml_path))[0]
     return os.path.join(dir_name, base_name)
 
+# --- Helper: resolve subsystem XML path, falling back from Dir/Name/Name.xml to Dir/Name.xml ---
+def resolve_subsystem_file(path):
+    if not os.path.isfile(path):
+        fn = os.path.splitext(os.path.basename(path))[0]
+        pd = os.path.dirname(path)
+        if fn == os.path.basename(pd):
+            c = os.path.join(os.path.dirname(pd), f"{fn}.xml")
+            if os.path.isfile(c):
+                return c
+        print(f"[ERROR] File not found: {path}", file=sys.stderr)
+        sys.exit(1)
+    return path
+
+# --- Helper: cached set of regular files in a directory (one scandir instead of a stat per file) ---
+# Names are normcase'd; look them up via os.path.normcase so matching stays case-insensitive on Windows.
+@functools.lru_cache(maxsize=4096)
+def dir_files(path):
+    try:
+        with os.scandir(path) as it:
+            return frozenset(os.path.normcase(e.name) for e in it if e.is_file())
+    except OSError:
+        return frozenset()
+
+# --- CommandInterface.xml parser target: keeps only the values show_ci renders ---
+class CIBuilder:
+    def __init__(self):
+        self.sections = {}
+        self.stack = []
+        self.text = []
+        self.section = None
+        self.item_tag = None
+        self.item = None
+
+    def start(self, tag, attrib):
+        depth = len(self.stack)
+        self.stack.append(tag)
+        self.text = []
+        if depth == 1:
+            # Top-level section; only the first occurrence of each is used
+            if tag in CI_SECTION_ITEMS and tag not in self.sections:
+                self.section = self.sections[tag] = []
+                self.item_tag = CI_SECTION_ITEMS[tag]
+            else:
+                self.section = None
+        elif depth == 2 and self.section is not None and tag == self.item_tag:
+            self.item = {"name": attrib.get("name", "")}
+
+    def data(self, text):
+        self.text.append(text)
+
+    def end(self, tag):
+        self.stack.pop()
+        item = self.item
+        if item is None:
+            return
+        depth = len(self.stack)
+        text = "".join(self.text)
+        if depth == 2:
+            item["text"] = text
+            self.section.append(item)
+            self.item = None
+        elif depth == 3 and tag in (TAG_CI_COMMAND_GROUP, TAG_CI_PLACEMENT):
+            item.setdefault(tag, text)
+        elif depth == 4 and tag == TAG_XR_COMMON and self.stack[-1] == TAG_CI_VISIBILITY:
+            item.setdefault("visibility", text)
+
+    def close(self):
+        return self.sections
+
 # --- Show functions ---
 def show_overview(sub_name, synonym, comment_text, incl_ci, use_one_cmd,
                   explanation, pic_text, content_items, groups, child_names, has_ci):
@@ -151,10 +278,8 @@ def show_overview(sub_name, synonym, comment_text, incl_ci, use_one_cmd,
     if pic_text:
         out(f"Картинка: {pic_text}")
     if len(content_items) > 0:
-        parts = []
-        for type_name in groups:
-            parts.append(f"{type_name}: {len(groups[type_name])}")
-        out(f"Состав: {len(content_items)} объектов ({', '.join(parts)})")
+        parts = ", ".join(f"{type_name}: {len(names)}" for type_name, names in groups.items())
+        out(f"Состав: {len(content_items)} объектов ({parts})")
     else:
         out("Состав: пусто")
     if len(child_names) > 0:
@@ -176,9 +301,9 @@ def show_content(sub_name, content_items, groups, name_filter):
             out(f"[INFO] Тип '{name_filter}' не найден в составе.")
             out(f"Доступные типы: {', '.join(groups.keys())}")
     else:
-        for type_name in groups:
-            out(f"{type_name} ({len(groups[type_name])}):")
-            for n in groups[type_name]:
+        for type_name, names in groups.items():
+            out(f"{type_name} ({len(names)}):")
+            for n in names:
                 out(f"  {n}")
             out()
 
@@ -193,24 +318,22 @@ def show_ci(sub_name, subsystem_path_local):
         out("Файл CommandInterface.xml не найден.")
         out(f"Путь: {local_ci_path}")
     else:
-        ci_tree = etree.parse(local_ci_path, etree.XMLParser(remove_blank_text=False))
-        ci_root = ci_tree.getroot()
+        sections = etree.parse(local_ci_path, etree.XMLParser(
+            target=CIBuilder(), resolve_entities=False, no_network=True, huge_tree=True))
 
         out(f"Командный интерфейс: {sub_name}")
         out()
 
         # --- CommandsVisibility ---
-        vis_section = ci_root.find("ci:CommandsVisibility", CI_NS)
-        if vis_section is not None:
+        vis_cmds = sections.get(TAG_CI_COMMANDS_VISIBILITY)
+        if vis_cmds is not None:
             hidden = []
             shown = []
-            for cmd in vis_section.findall("ci:Command", CI_NS):
-                cmd_name = cmd.get("name", "")
-                vis = cmd.find("ci:Visibility/xr:Common", CI_NS)
-                if vis is not None and vis.text == "false":
-                    hidden.append(cmd_name)
+            for cmd in vis_cmds:
+                if cmd.get("visibility") == "false":
+                    hidden.append(cmd["name"])
                 else:
-                    shown.append(cmd_name)
+                    shown.append(cmd["name"])
             total = len(hidden) + len(shown)
             if not args.Name or args.Name == "visibility":
                 out(f"Видимость ({total}):")
@@ -225,16 +348,15 @@ def show_ci(sub_name, subsystem_path_local):
                 out()
 
         # --- CommandsPlacement ---
-        place_section = ci_root.find("ci:CommandsPlacement", CI_NS)
-        if place_section is not None:
+        place_cmds = sections.get(TAG_CI_COMMANDS_PLACEMENT)
+        if place_cmds is not None:
             placements = []
-            for cmd in place_section.findall("ci:Command", CI_NS):
-                cmd_name = cmd.get("name", "")
-                grp = cmd.find("ci:CommandGroup", CI_NS)
-                pl = cmd.find("ci:Placement", CI_NS)
-                grp_text = grp.text if grp is not None and grp.text else "?"
-                pl_text = pl.text if pl is not None and pl.text else "?"
-                placements.append({"Name": cmd_name, "Group": grp_text, "Placement": pl_text})
+            for cmd in place_cmds:
+                placements.append({
+                    "Name": cmd["name"],
+                    "Group": cmd.get(TAG_CI_COMMAND_GROUP) or "?",
+                    "Placement": cmd.get(TAG_CI_PLACEMENT) or "?",
+                })
             if (not args.Name or args.Name == "placement") and placements:
                 arrow = "\u2192"
                 out(f"Размещение ({len(placements)}):")
@@ -243,16 +365,14 @@ def show_ci(sub_name, subsystem_path_local):
                 out()
 
         # --- CommandsOrder ---
-        order_section = ci_root.find("ci:CommandsOrder", CI_NS)
-        if order_section is not None:
+        order_cmds = sections.get(TAG_CI_COMMANDS_ORDER)
+        if order_cmds is not None:
             order_groups = OrderedDict()
-            for cmd in order_section.findall("ci:Command", CI_NS):
-                cmd_name = cmd.get("name", "")
-                grp = cmd.find("ci:CommandGroup", CI_NS)
-                grp_text = grp.text if grp is not None and grp.text else "?"
+            for cmd in order_cmds:
+                grp_text = cmd.get(TAG_CI_COMMAND_GROUP) or "?"
                 if grp_text not in order_groups:
                     order_groups[grp_text] = []
-                order_groups[grp_text].append(cmd_name)
+                order_groups[grp_text].append(cmd["name"])
             total_order = sum(len(v) for v in order_groups.values())
             if (not args.Name or args.Name == "order") and total_order > 0:
                 out(f"Порядок команд ({total_order}):")
@@ -263,12 +383,9 @@ def show_ci(sub_name, subsystem_path_local):
                 out()
 
         # --- SubsystemsOrder ---
-        sub_order_section = ci_root.find("ci:SubsystemsOrder", CI_NS)
-        if sub_order_section is not None:
-            sub_order = []
-            for s in sub_order_section.findall("ci:Subsystem", CI_NS):
-                if s.text:
-                    sub_order.append(s.text)
+        sub_order_items = sections.get(TAG_CI_SUBSYSTEMS_ORDER)
+        if sub_order_items is not None:
+            sub_order = [s["text"] for s in sub_order_items if s["text"]]
             if (not args.Name or args.Name == "subsystems") and sub_order:
                 out(f"Порядок подсистем ({len(sub_order)}):")
                 for i, s in enumerate(sub_order):
@@ -276,12 +393,9 @@ def show_ci(sub_name, subsystem_path_local):
                 out()
 
         # --- GroupsOrder ---
-        grp_order_section = ci_root.find("ci:GroupsOrder", CI_NS)
-        if grp_order_section is not None:
-            grp_order = []
-            for g in grp_order_section.findall("ci:Group", CI_NS):
-                if g.text:
-                    grp_order.append(g.text)
+        grp_order_items = sections.get(TAG_CI_GROUPS_ORDER)
+        if grp_order_items is not None:
+            grp_order = [g["text"] for g in grp_order_items if g["text"]]
             if (not args.Name or args.Name == "groups") and grp_order:
                 out(f"Порядок групп ({len(grp_order)}):")
                 for g in grp_order:
@@ -310,38 +424,63 @@ if args.Mode == "tree":
     T_PIPE   = "\u2502   "             # │
     T_ARROW  = "\u2192"                # →
 
+    @functools.lru_cache(maxsize=None)
     def get_tree_line(xml_path):
-        parsed = load_subsystem_xml(xml_path)
-        sub = parsed["Sub"]
-        props = sub.find("md:Properties", NS)
-        name_node = props.find("md:Name", NS)
-        name = name_node.text if name_node is not None else ""
+        summary = load_tree_summary(xml_path)
+        if summary is None:
+            return None
+        name = summary["Name"]
 
         markers = []
         sub_dir = get_subsystem_dir(xml_path)
-        ci_path = os.path.join(sub_dir, "Ext", "CommandInterface.xml")
-        if os.path.isfile(ci_path):
+        if os.path.normcase("CommandInterface.xml") in dir_files(os.path.join(sub_dir, "Ext")):
             markers.append("CI")
-        use_one = props.find("md:UseOneCommand", NS)
-        if use_one is not None and use_one.text == "true":
+        if summary["UseOneCommand"] == "true":
             markers.append("OneCmd")
-        incl_ci_node = props.find("md:IncludeInCommandInterface", NS)
-        if incl_ci_node is not None and incl_ci_node.text == "false":
+        if summary["IncludeInCommandInterface"] == "false":
             markers.append("Скрыт")
         marker_str = f" [{', '.join(markers)}]" if markers else ""
 
-        content_items = get_content_items(props)
-        child_names = get_child_names(sub)
+        child_names = summary["ChildNames"]
         child_str = f", {len(child_names)} дочерних" if child_names else ""
 
-        return {
-            "Label": f"{name}{marker_str} ({len(content_items)} объектов{child_str})",
-            "SubDir": sub_dir,
-            "ChildNames": child_names,
-        }
+        # Cached, so return an immutable (label, sub_dir, child_names) tuple
+        label = f"{name}{marker_str} ({summary['ContentCount']} объектов{child_str})"
+        return label, sub_dir, tuple(child_names)
+
+    def prefetch_tree(xml_paths):
+        # Parse the tree level by level on a thread pool (lxml releases the GIL while
+        # parsing); rendering below then reads every entry from the get_tree_line cache.
+        # Failures are left for the rendering pass to report in tree order.
+        seen = set(xml_paths)
+        level = list(xml_paths)
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            while level:
+                futures = [pool.submit(get_tree_line, p) for p in level]
+                level = []
+                for fut in futures:
+                    try:
+                        entry = fut.result()
+                    except Exception:
+                        continue
+                    if entry is None:
+                        continue
+                    _, sub_dir, child_names = entry
+                    subs_dir = f"{sub_dir}{os.sep}Subsystems"
+                    subs_files = dir_files(subs_dir)
+                    for child_name in child_names:
+                        child_file = f"{child_name}.xml"
+                        child_xml = f"{subs_dir}{os.sep}{child_file}"
+                        if os.path.normcase(child_file) in subs_files and child_xml not in seen:
+                            seen.add(child_xml)
+                            level.append(child_xml)
 
     def build_tree_entry(xml_path, prefix, is_last, is_root):
-        info = get_tree_line(xml_path)
+        entry = get_tree_line(xml_path)
+        if entry is None:
+            print(f"[ERROR] Not a valid subsystem XML: {xml_path}", file=sys.stderr)
+            sys.exit(1)
+        label, sub_dir, child_names = entry
 
         if is_root:
             connector = ""
@@ -349,9 +488,9 @@ if args.Mode == "tree":
             connector = T_LAST
         else:
             connector = T_BRANCH
-        out(f"{prefix}{connector}{info['Label']}")
+        out(f"{prefix}{connector}{label}")
 
-        if info["ChildNames"]:
+        if child_names:
             if is_root:
                 child_prefix = ""
             elif is_last:
@@ -359,12 +498,13 @@ if args.Mode == "tree":
             else:
                 child_prefix = prefix + T_PIPE
 
-            subs_dir = os.path.join(info["SubDir"], "Subsystems")
-            for i, child_name in enumerate(info["ChildNames"]):
-                child_xml = os.path.join(subs_dir, f"{child_name}.xml")
-                child_is_last = (i == len(info["ChildNames"]) - 1)
-                if os.path.isfile(child_xml):
-                    build_tree_entry(child_xml, child_prefix, child_is_last, False)
+            subs_dir = f"{sub_dir}{os.sep}Subsystems"
+            subs_files = dir_files(subs_dir)
+            for i, child_name in enumerate(child_names):
+                child_file = f"{child_name}.xml"
+                child_is_last = (i == len(child_names) - 1)
+                if os.path.normcase(child_file) in subs_files:
+                    build_tree_entry(f"{subs_dir}{os.sep}{child_file}", child_prefix, child_is_last, False)
                 else:
                     conn2 = T_LAST if child_is_last else T_BRANCH
                     out(f"{child_prefix}{conn2}{child_name} [NOT FOUND]")
@@ -373,18 +513,22 @@ if args.Mode == "tree":
         label = os.path.basename(root_dir)
         out(f"Дерево подсистем от: {label}/")
         out()
-        xml_files = sorted(
-            [f for f in os.listdir(root_dir) if f.lower().endswith(".xml") and os.path.isfile(os.path.join(root_dir, f))],
-            key=lambda x: x.lower()
-        )
+        with os.scandir(root_dir) as it:
+            xml_files = sorted(
+                (e.name for e in it if e.name.lower().endswith(".xml") and e.is_file()),
+                key=str.lower
+            )
         if args.Name:
             xml_files = [f for f in xml_files if os.path.splitext(f)[0] == args.Name]
             if not xml_files:
                 print(f"[ERROR] Subsystem '{args.Name}' not found in {root_dir}", file=sys.stderr)
                 sys.exit(1)
-        for i, fname in enumerate(xml_files):
-            build_tree_entry(os.path.join(root_dir, fname), "", i == len(xml_files) - 1, True)
+        root_xmls = [os.path.join(root_dir, fname) for fname in xml_files]
+        prefetch_tree(root_xmls)
+        for i, xml_path in enumerate(root_xmls):
+            build_tree_entry(xml_path, "", i == len(root_xmls) - 1, True)
     else:
+        prefetch_tree([root_xml])
         build_tree_entry(root_xml, "", True, True)
 
 elif args.Mode == "ci":
@@ -394,22 +538,12 @@ elif args.Mode == "ci":
     if os.path.isdir(subsystem_path):
         print("[ERROR] ci mode requires a subsystem .xml file, not a directory", file=sys.stderr)
         sys.exit(1)
-    # File not found -- check Dir/Name/Name.xml -> Dir/Name.xml
-    if not os.path.isfile(subsystem_path):
-        fn = os.path.splitext(os.path.basename(subsystem_path))[0]
-        pd = os.path.dirname(subsystem_path)
-        if fn == os.path.basename(pd):
-            c = os.path.join(os.path.dirname(pd), f"{fn}.xml")
-            if os.path.isfile(c):
-                subsystem_path = c
-    if not os.path.isfile(subsystem_path):
-        print(f"[ERROR] File not found: {subsystem_path}", file=sys.stderr)
-        sys.exit(1)
+    subsystem_path = resolve_subsystem_file(subsystem_path)
 
     parsed = load_subsystem_xml(subsystem_path)
     sub = parsed["Sub"]
-    props = sub.find("md:Properties", NS)
-    name_node = props.find("md:Name", NS)
+    props = first_child(sub, TAG_PROPERTIES)
+    name_node = first_child(props, TAG_NAME)
     sub_name = name_node.text if name_node is not None else ""
 
     show_ci(sub_name, subsystem_path)
@@ -430,40 +564,28 @@ else:
             print(f"[ERROR] No {dir_name}.xml found in directory. Use -Mode tree for directory listing.", file=sys.stderr)
             sys.exit(1)
 
-    # File not found -- check Dir/Name/Name.xml -> Dir/Name.xml
-    if not os.path.isfile(subsystem_path):
-        fn = os.path.splitext(os.path.basename(subsystem_path))[0]
-        pd = os.path.dirname(subsystem_path)
-        if fn == os.path.basename(pd):
-            c = os.path.join(os.path.dirname(pd), f"{fn}.xml")
-            if os.path.isfile(c):
-                subsystem_path = c
-    if not os.path.isfile(subsystem_path):
-        print(f"[ERROR] File not found: {subsystem_path}", file=sys.stderr)
-        sys.exit(1)
+    subsystem_path = resolve_subsystem_file(subsystem_path)
 
     parsed = load_subsystem_xml(subsystem_path)
     sub = parsed["Sub"]
-    props = sub.find("md:Properties", NS)
+    props = first_child(sub, TAG_PROPERTIES)
 
-    name_node = props.find("md:Name", NS)
+    name_node = first_child(props, TAG_NAME)
     sub_name = name_node.text if name_node is not None else ""
-    synonym = get_ml_text(props.find("md:Synonym", NS))
-    comment_node = props.find("md:Comment", NS)
+    synonym = get_ml_text(first_child(props, TAG_SYNONYM))
+    comment_node = first_child(props, TAG_COMMENT)
     comment_text = comment_node.text if comment_node is not None and comment_node.text else ""
-    incl_help_node = props.find("md:IncludeHelpInContents", NS)
-    incl_help = incl_help_node.text if incl_help_node is not None else ""
-    incl_ci_node = props.find("md:IncludeInCommandInterface", NS)
+    incl_ci_node = first_child(props, TAG_INCLUDE_IN_CI)
     incl_ci = incl_ci_node.text if incl_ci_node is not None else ""
-    use_one_cmd_node = props.find("md:UseOneCommand", NS)
+    use_one_cmd_node = first_child(props, TAG_USE_ONE_COMMAND)
     use_one_cmd = use_one_cmd_node.text if use_one_cmd_node is not None else ""
-    explanation = get_ml_text(props.find("md:Explanation", NS))
+    explanation = get_ml_text(first_child(props, TAG_EXPLANATION))
 
     # Picture
-    pic_node = props.find("md:Picture", NS)
+    pic_node = first_child(props, TAG_PICTURE)
     pic_text = ""
     if pic_node is not None and len(pic_node) > 0:
-        pic_ref = pic_node.find("xr:Ref", NS)
+        pic_ref = first_child(pic_node, TAG_PICTURE_REF)
         if pic_ref is not None and pic_ref.text:
             pic_text = pic_ref.text
 
@@ -498,28 +620,28 @@ else:
 
 # --- Pagination and output ---
 total_lines = len(lines_buf)
-out_lines = lines_buf[:]
+start = max(args.Offset, 0)
+
+if start > 0 and start >= total_lines:
+    print(f"[INFO] Offset {args.Offset} exceeds total lines ({total_lines}). Nothing to show.")
+    sys.exit(0)
 
-if args.Offset > 0:
-    if args.Offset >= total_lines:
-        print(f"[INFO] Offset {args.Offset} exceeds total lines ({total_lines}). Nothing to show.")
-        sys.exit(0)
-    out_lines = out_lines[args.Offset:]
+end = start + args.Limit if args.Limit > 0 else total_lines
+out_lines = lines_buf[start:end]
 
-if args.Limit > 0 and len(out_lines) > args.Limit:
-    shown = out_lines[:args.Limit]
-    remaining = total_lines - args.Offset - args.Limit
-    shown.append("")
-    shown.append(f"[ОБРЕЗАНО] Показано {args.Limit} из {total_lines} строк. Используйте -Offset {args.Offset + args.Limit} для продолжения.")
-    out_lines = shown
+if end < total_lines:
+    out_lines.append("")
+    out_lines.append(f"[ОБРЕЗАНО] Показано {args.Limit} из {total_lines} строк. Используйте -Offset {args.Offset + args.Limit} для продолжения.")
 
 if args.OutFile:
     out_file = args.OutFile
     if not os.path.isabs(out_file):
         out_file = os.path.join(os.getcwd(), out_file)
-    with open(out_file, "w", encoding="utf-8-sig") as f:
-        f.write("\n".join(out_lines))
+    # Stream lines through a large buffer instead of building one joined string
+    with open(out_file, "w", encoding="utf-8-sig", buffering=1 << 20) as f:
+        lines_iter = iter(out_lines)
+        f.write(next(lines_iter, ""))
+        f.writelines("\n" + line for line in lines_iter)
     print(f"Output written to {out_file}")
-else:
-    for line in out_lines:
-        print(line)
+elif out_lines:
+    sys.stdout.write("\n".join(out_lines) + "\n")
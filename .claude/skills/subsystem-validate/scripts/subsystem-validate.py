@@ -3,6 +3,9 @@
 # Source: https://github.com/Nikolay-Shirokov/cc-1c-skills
 """Validates subsystem XML file structure, properties, content items, child objects."""
 import sys, os, argparse, re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from lxml import etree
 
 NS = {
@@ -12,13 +15,56 @@ NS = {
     'xsi': 'http://www.w3.org/2001/XMLSchema-instance',
 }
 
-GUID_PATTERN = re.compile(
-    r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'
+# Clark-notation prefixes: plain tag strings need no prefix resolution
+MD = f'{{{NS["md"]}}}'
+V8 = f'{{{NS["v8"]}}}'
+XR = f'{{{NS["xr"]}}}'
+
+TAG_SUBSYSTEM = MD + 'Subsystem'
+TAG_PROPERTIES = MD + 'Properties'
+TAG_CHILD_OBJECTS = MD + 'ChildObjects'
+TAG_V8_ITEM = V8 + 'item'
+TAG_V8_CONTENT = V8 + 'content'
+TAG_XR_ITEM = XR + 'Item'
+TAG_XR_REF = XR + 'Ref'
+ATTR_XSI_TYPE = f'{{{NS["xsi"]}}}type'
+
+REQUIRED_PROPS = (
+    'Name', 'Synonym', 'Comment', 'IncludeHelpInContents',
+    'IncludeInCommandInterface', 'UseOneCommand', 'Explanation',
+    'Picture', 'Content'
 )
-IDENT_PATTERN = re.compile(
-    r'^[A-Za-z\u0410-\u042F\u0401\u0430-\u044F\u0451_]'
-    r'[A-Za-z0-9\u0410-\u042F\u0401\u0430-\u044F\u0451_]*$'
+BOOL_PROPS = ('IncludeHelpInContents', 'IncludeInCommandInterface', 'UseOneCommand')
+# Compiled once per property instead of an ElementPath parse per find()
+PROP_XPATH = {p: etree.XPath(f'md:{p}', namespaces=NS) for p in REQUIRED_PROPS}
+
+HEX_CHARS = frozenset('0123456789abcdefABCDEF')
+GUID_DASHES = (8, 13, 18, 23)
+# Identifier alphabet: Latin, Russian Cyrillic (incl. Ё/ё), underscore; digits after the first char
+IDENT_START = frozenset(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_\u0401\u0451'
+    + ''.join(chr(c) for c in range(0x0410, 0x0450))
 )
+IDENT_CONT = IDENT_START | frozenset('0123456789')
+CONTENT_REF_PATTERN = re.compile(r'^[A-Za-z]+\..+$')
+
+
+class NullTarget:
+    """Parser target that discards all events: a well-formedness check builds no tree."""
+    def start(self, tag, attrib, nsmap=None):
+        pass
+
+    def end(self, tag):
+        pass
+
+    def data(self, data):
+        pass
+
+    def close(self):
+        return None
+
+
+WF_PARSER = etree.XMLParser(target=NullTarget())
 
 
 class Reporter:
@@ -27,7 +73,7 @@ class Reporter:
         self.warnings = 0
         self.stopped = False
         self.max_errors = max_errors
-        self.lines = []
+        self.lines = deque()
 
     def out(self, msg=''):
         self.lines.append(msg)
@@ -49,33 +95,63 @@ class Reporter:
         return '\r\n'.join(self.lines) + '\r\n'
 
 
-def find_duplicates(items):
-    seen = {}
-    dupes = []
-    for item in items:
-        seen[item] = seen.get(item, 0) + 1
-    for item, count in seen.items():
-        if count > 1 and item not in dupes:
-            dupes.append(item)
-    return dupes
+def is_guid(s):
+    """8-4-4-4-12 hex digits.
 
+    >>> is_guid('01234567-89ab-cdef-0123-456789ABCDEF')
+    True
+    >>> is_guid('-' * 36)
+    False
+    >>> is_guid('1234567--1234-1234-1234-123456789abc')
+    False
+    """
+    return (len(s) == 36 and all(s[i] == '-' for i in GUID_DASHES)
+            and all(c in HEX_CHARS for i, c in enumerate(s) if i not in GUID_DASHES))
 
-def main():
-    sys.stdout.reconfigure(encoding="utf-8")
-    sys.stderr.reconfigure(encoding="utf-8")
-    parser = argparse.ArgumentParser(
-        description='Validate 1C subsystem XML structure', allow_abbrev=False
-    )
-    parser.add_argument('-SubsystemPath', dest='SubsystemPath', required=True)
-    parser.add_argument('-MaxErrors', dest='MaxErrors', type=int, default=30)
-    parser.add_argument('-OutFile', dest='OutFile', default='')
-    args = parser.parse_args()
 
-    subsystem_path = args.SubsystemPath
-    max_errors = args.MaxErrors
-    out_file = args.OutFile
+def is_ident(s):
+    return bool(s) and s[0] in IDENT_START and all(c in IDENT_CONT for c in s[1:])
+
+
+def find_prop(props, name):
+    found = PROP_XPATH[name](props)
+    return found[0] if found else None
+
+
+def find_duplicates(counts):
+    return [item for item, count in counts.items() if count > 1]
+
+
+def load_subsystem(path):
+    """Stream the subsystem file, keeping only the first MetaDataObject/Subsystem's
+    Properties and ChildObjects subtrees; everything else is cleared as it is read.
+    Returns (version, sub, props, child_objs); sub is None if there is no Subsystem."""
+    root = sub = props = child_objs = None
+    version = ''
+    for event, el in etree.iterparse(path, events=('start', 'end'), remove_blank_text=False):
+        if event == 'start':
+            if root is None:
+                root = el
+                version = el.get('version', '')
+            elif sub is None and el.tag == TAG_SUBSYSTEM and el.getparent() is root:
+                sub = el
+            continue
+        parent = el.getparent()
+        if sub is not None and parent is sub:
+            if el.tag == TAG_PROPERTIES and props is None:
+                props = el
+            elif el.tag == TAG_CHILD_OBJECTS and child_objs is None:
+                child_objs = el
+            else:
+                el.clear()
+        elif parent is root and el is not sub:
+            el.clear()
+    return version, sub, props, child_objs
 
-    # --- Resolve path ---
+
+def resolve_subsystem_path(subsystem_path):
+    """Resolve a subsystem argument (file, its directory, or Dir/Name/Name.xml) to
+    an absolute XML path. Raises FileNotFoundError with the report message."""
     if not os.path.isabs(subsystem_path):
         subsystem_path = os.path.join(os.getcwd(), subsystem_path)
 
@@ -88,8 +164,7 @@ def main():
         elif os.path.exists(sibling):
             subsystem_path = sibling
         else:
-            print(f'[ERROR] No {dir_name}.xml found in directory: {subsystem_path}')
-            sys.exit(1)
+            raise FileNotFoundError(f'No {dir_name}.xml found in directory: {subsystem_path}')
 
     # File not found -- check Dir/Name/Name.xml -> Dir/Name.xml
     if not os.path.exists(subsystem_path):
@@ -101,44 +176,44 @@ def main():
                 subsystem_path = c
 
     if not os.path.exists(subsystem_path):
-        print(f'[ERROR] File not found: {subsystem_path}')
-        sys.exit(1)
+        raise FileNotFoundError(f'File not found: {subsystem_path}')
 
-    resolved_path = os.path.abspath(subsystem_path)
-    r = Reporter(max_errors)
+    return os.path.abspath(subsystem_path)
 
-    # --- 1. XML well-formedness + root structure ---
-    xml_doc = None
+
+def validate_one(subsystem_path, max_errors=30):
+    """Run all checks on one subsystem and return the filled Reporter."""
+    r = Reporter(max_errors)
     try:
-        xml_parser = etree.XMLParser(remove_blank_text=False)
-        xml_doc = etree.parse(resolved_path, xml_parser)
-    except etree.XMLSyntaxError as e:
-        r.error(f'1. XML parse error: {e}')
+        resolved_path = resolve_subsystem_path(subsystem_path)
+    except FileNotFoundError as e:
+        r.error(str(e))
         r.stopped = True
+        resolved_path = None
 
-    sub = None
+    # --- 1. XML well-formedness + root structure ---
+    sub = props = child_objs = None
     version = ''
     if not r.stopped:
-        root = xml_doc.getroot()
-        version = root.get('version', '')
-        sub_list = root.findall('md:Subsystem', NS)
-        sub = sub_list[0] if sub_list else None
+        try:
+            version, sub, props, child_objs = load_subsystem(resolved_path)
+        except etree.XMLSyntaxError as e:
+            r.error(f'1. XML parse error: {e}')
+            r.stopped = True
 
+    if not r.stopped:
         if sub is None:
             r.error('1. Root structure: expected MetaDataObject/Subsystem, not found')
             r.stopped = True
         else:
             uuid_val = sub.get('uuid', '')
-            if uuid_val and GUID_PATTERN.match(uuid_val):
+            if is_guid(uuid_val):
                 r.ok(f'1. Root structure: MetaDataObject/Subsystem, uuid={uuid_val}, version {version}')
             else:
                 r.error('1. Root structure: invalid or missing uuid')
 
     # --- Properties checks ---
-    props = None
     if not r.stopped:
-        props_list = sub.findall('md:Properties', NS)
-        props = props_list[0] if props_list else None
         if props is None:
             r.error('2. Properties: <Properties> element not found')
             r.stopped = True
@@ -146,14 +221,9 @@ def main():
     sub_name = ''
     if not r.stopped:
         # --- 2. Required properties ---
-        required_props = [
-            'Name', 'Synonym', 'Comment', 'IncludeHelpInContents',
-            'IncludeInCommandInterface', 'UseOneCommand', 'Explanation',
-            'Picture', 'Content'
-        ]
         missing = []
-        for p in required_props:
-            el = props.find(f'md:{p}', NS)
+        for p in REQUIRED_PROPS:
+            el = find_prop(props, p)
             if el is None:
                 missing.append(p)
 
@@ -163,17 +233,17 @@ def main():
             r.error(f'2. Properties: missing: {", ".join(missing)}')
 
         # --- 3. Name ---
-        name_el = props.find('md:Name', NS)
+        name_el = find_prop(props, 'Name')
         sub_name = (name_el.text or '').strip() if name_el is not None else ''
 
         r.out('')
         r.out(f'=== Validation: Subsystem.{sub_name} ===')
         # Re-insert header at position 0
         header_line = f'=== Validation: Subsystem.{sub_name} ==='
-        r.lines.insert(0, '')
-        r.lines.insert(0, header_line)
+        r.lines.appendleft('')
+        r.lines.appendleft(header_line)
 
-        if sub_name and IDENT_PATTERN.match(sub_name):
+        if is_ident(sub_name):
             r.ok(f'3. Name: "{sub_name}" - valid identifier')
         elif not sub_name:
             r.error('3. Name: empty')
@@ -181,13 +251,13 @@ def main():
             r.error(f'3. Name: "{sub_name}" - invalid identifier')
 
         # --- 4. Synonym ---
-        syn_el = props.find('md:Synonym', NS)
+        syn_el = find_prop(props, 'Synonym')
         if syn_el is not None and len(syn_el) > 0:
-            items = syn_el.findall('v8:item', NS)
+            items = syn_el.findall(TAG_V8_ITEM)
             if len(items) > 0:
                 first_content = ''
                 for item in items:
-                    c = item.find('v8:content', NS)
+                    c = item.find(TAG_V8_CONTENT)
                     if c is not None and c.text:
                         first_content = c.text
                         break
@@ -198,11 +268,10 @@ def main():
             r.warn('4. Synonym: empty or missing')
 
         # --- 5. Boolean properties ---
-        bool_props = ['IncludeHelpInContents', 'IncludeInCommandInterface', 'UseOneCommand']
         bool_ok = True
         bool_vals = {}
-        for bp in bool_props:
-            el = props.find(f'md:{bp}', NS)
+        for bp in BOOL_PROPS:
+            el = find_prop(props, bp)
             if el is not None:
                 val = (el.text or '').strip()
                 bool_vals[bp] = val
@@ -213,19 +282,19 @@ def main():
             r.ok('5. Boolean properties: valid')
 
         # --- 6. Content items format ---
-        content_el = props.find('md:Content', NS)
-        content_items = []
+        content_el = find_prop(props, 'Content')
+        content_counts = Counter()
         if content_el is not None and len(content_el) > 0:
-            xr_items = content_el.findall('xr:Item', NS)
+            xr_items = content_el.findall(TAG_XR_ITEM)
             content_ok = True
             for item in xr_items:
-                type_attr = item.get(f'{{{NS["xsi"]}}}type', '')
+                type_attr = item.get(ATTR_XSI_TYPE, '')
                 text = (item.text or '').strip()
-                content_items.append(text)
+                content_counts[text] += 1
                 if type_attr != 'xr:MDObjectRef':
                     r.error(f'6. Content item "{text}": xsi:type="{type_attr}" (expected xr:MDObjectRef)')
                     content_ok = False
-                if not re.match(r'^[A-Za-z]+\..+$', text) and not GUID_PATTERN.match(text):
+                if not CONTENT_REF_PATTERN.match(text) and not is_guid(text):
                     r.error(f'6. Content item "{text}": invalid format (expected Type.Name or UUID)')
                     content_ok = False
             if content_ok:
@@ -234,8 +303,9 @@ def main():
             r.ok('6. Content: empty (no items)')
 
         # --- 7. Content duplicates ---
-        if len(content_items) > 0:
-            dupes = find_duplicates(content_items)
+        content_total = sum(content_counts.values())
+        if content_total > 0:
+            dupes = find_duplicates(content_counts)
             if dupes:
                 r.warn(f'7. Content: duplicates found: {", ".join(dupes)}')
             else:
@@ -244,22 +314,21 @@ def main():
             r.ok('7. Content: no duplicates (empty)')
 
         # --- 8. ChildObjects entries non-empty ---
-        child_objs = sub.find('md:ChildObjects', NS)
         child_names = []
+        child_counts = Counter()
         if child_objs is not None and len(child_objs) > 0:
             child_ok = True
-            for child in child_objs:
-                if not isinstance(child.tag, str):
-                    continue
-                local_name = etree.QName(child.tag).localname
-                if local_name != 'Subsystem':
-                    r.error(f'8. ChildObjects: unexpected element <{local_name}>')
+            for child in child_objs.iterchildren(tag=etree.Element):
+                if child.tag != TAG_SUBSYSTEM:
+                    r.error(f'8. ChildObjects: unexpected element <{etree.QName(child).localname}>')
                     child_ok = False
                 elif not (child.text or '').strip():
                     r.error('8. ChildObjects: empty <Subsystem> element')
                     child_ok = False
                 else:
-                    child_names.append((child.text or '').strip())
+                    child_name = child.text.strip()
+                    child_names.append(child_name)
+                    child_counts[child_name] += 1
             if child_ok:
                 r.ok(f'8. ChildObjects: {len(child_names)} entries, all non-empty')
         else:
@@ -267,7 +336,7 @@ def main():
 
         # --- 9. ChildObjects duplicates ---
         if len(child_names) > 0:
-            dupes = find_duplicates(child_names)
+            dupes = find_duplicates(child_counts)
             if dupes:
                 r.error(f'9. ChildObjects: duplicates: {", ".join(dupes)}')
             else:
@@ -280,11 +349,13 @@ def main():
             parent_dir = os.path.dirname(resolved_path)
             base_name = os.path.splitext(os.path.basename(resolved_path))[0]
             subs_dir = os.path.join(parent_dir, base_name, 'Subsystems')
-            missing_files = []
-            for cn in child_names:
-                child_xml = os.path.join(subs_dir, cn + '.xml')
-                if not os.path.exists(child_xml):
-                    missing_files.append(cn)
+            # One directory read instead of a stat() per child; normcase keeps exists()'s case-insensitivity on Windows
+            try:
+                with os.scandir(subs_dir) as it:
+                    existing = {os.path.normcase(e.name) for e in it}
+            except OSError:
+                existing = set()
+            missing_files = [cn for cn in child_names if os.path.normcase(cn + '.xml') not in existing]
             if len(missing_files) == 0:
                 r.ok(f'10. ChildObjects files: all {len(child_names)} files exist')
             else:
@@ -298,7 +369,7 @@ def main():
         ci_path = os.path.join(parent_dir2, base_name2, 'Ext', 'CommandInterface.xml')
         if os.path.exists(ci_path):
             try:
-                etree.parse(ci_path, etree.XMLParser(remove_blank_text=False))
+                etree.parse(ci_path, WF_PARSER)
                 r.ok('11. CommandInterface: exists, well-formed')
             except etree.XMLSyntaxError as e:
                 r.warn(f'11. CommandInterface: exists but NOT well-formed: {e}')
@@ -306,9 +377,9 @@ def main():
             r.ok('11. CommandInterface: not present')
 
         # --- 12. Picture format ---
-        pic_el = props.find('md:Picture', NS)
+        pic_el = find_prop(props, 'Picture')
         if pic_el is not None and len(pic_el) > 0:
-            pic_ref = pic_el.find('xr:Ref', NS)
+            pic_ref = pic_el.find(TAG_XR_REF)
             if pic_ref is not None and pic_ref.text:
                 ref_text = pic_ref.text
                 if ref_text.startswith('CommonPicture.'):
@@ -323,10 +394,10 @@ def main():
         # --- 13. UseOneCommand constraint ---
         use_one = bool_vals.get('UseOneCommand', '')
         if use_one == 'true':
-            if len(content_items) == 1:
+            if content_total == 1:
                 r.ok('13. UseOneCommand: true, Content has exactly 1 item')
             else:
-                r.warn(f'13. UseOneCommand: true but Content has {len(content_items)} items (expected 1)')
+                r.warn(f'13. UseOneCommand: true but Content has {content_total} items (expected 1)')
         else:
             r.ok('13. UseOneCommand: false (no constraint)')
 
@@ -334,8 +405,47 @@ def main():
     r.out('---')
     r.out(f'Errors: {r.errors}, Warnings: {r.warnings}')
 
-    result = r.text()
-    print(result, end='')
+    return r
+
+
+def main():
+    sys.stdout.reconfigure(encoding="utf-8")
+    sys.stderr.reconfigure(encoding="utf-8")
+    parser = argparse.ArgumentParser(
+        description='Validate 1C subsystem XML structure', allow_abbrev=False
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('-SubsystemPath', dest='SubsystemPath')
+    target.add_argument('-SubsystemPaths', dest='SubsystemPaths', nargs='+')
+    parser.add_argument('-MaxErrors', dest='MaxErrors', type=int, default=30)
+    parser.add_argument('-OutFile', dest='OutFile', default='')
+    args = parser.parse_args()
+
+    max_errors = args.MaxErrors
+    out_file = args.OutFile
+
+    if args.SubsystemPath is not None:
+        try:
+            resolved_path = resolve_subsystem_path(args.SubsystemPath)
+        except FileNotFoundError as e:
+            print(f'[ERROR] {e}')
+            sys.exit(1)
+        reports = [validate_one(resolved_path, max_errors)]
+    elif len(args.SubsystemPaths) == 1:
+        reports = [validate_one(args.SubsystemPaths[0], max_errors)]
+    else:
+        # Subsystems are independent: validate them in parallel processes
+        with ProcessPoolExecutor() as ex:
+            reports = list(ex.map(validate_one, args.SubsystemPaths, repeat(max_errors), chunksize=8))
+
+    result = '\r\n'.join(r.text() for r in reports)
+    total_errors = sum(r.errors for r in reports)
+    if len(reports) > 1:
+        total_warnings = sum(r.warnings for r in reports)
+        result += f'\r\n=== Total: {len(reports)} subsystems, Errors: {total_errors}, Warnings: {total_warnings} ===\r\n'
+    sys.stdout.flush()
+    sys.stdout.buffer.write(result.encode('utf-8'))
+    sys.stdout.buffer.flush()
 
     if out_file:
         if not os.path.isabs(out_file):
@@ -344,7 +454,7 @@ def main():
             f.write(result)
         print(f'Written to: {out_file}')
 
-    sys.exit(1 if r.errors > 0 else 0)
+    sys.exit(1 if total_errors > 0 else 0)
 
 
 if __name__ == '__main__':
@@ -9,7 +9,31 @@ import uuid
 
 from lxml import etree
 
-NSMAP = {"md": "http://v8.1c.ru/8.3/MDClasses"}
+MD_NS = "http://v8.1c.ru/8.3/MDClasses"
+V8_NS = "http://v8.1c.ru/8.1/data/core"
+
+# Namespace declarations of a metadata object file, in 1C export order
+NSMAP_FULL = {
+    None: MD_NS,
+    "app": "http://v8.1c.ru/8.2/managed-application/core",
+    "cfg": "http://v8.1c.ru/8.1/data/enterprise/current-config",
+    "cmi": "http://v8.1c.ru/8.2/managed-application/cmi",
+    "ent": "http://v8.1c.ru/8.1/data/enterprise",
+    "lf": "http://v8.1c.ru/8.2/managed-application/logform",
+    "style": "http://v8.1c.ru/8.1/data/ui/style",
+    "sys": "http://v8.1c.ru/8.1/data/ui/fonts/system",
+    "v8": V8_NS,
+    "v8ui": "http://v8.1c.ru/8.1/data/ui",
+    "web": "http://v8.1c.ru/8.1/data/ui/colors/web",
+    "win": "http://v8.1c.ru/8.1/data/ui/colors/windows",
+    "xen": "http://v8.1c.ru/8.3/xcf/enums",
+    "xpr": "http://v8.1c.ru/8.3/xcf/predef",
+    "xr": "http://v8.1c.ru/8.3/xcf/readable",
+    "xs": "http://www.w3.org/2001/XMLSchema",
+    "xsi": "http://www.w3.org/2001/XMLSchema-instance",
+}
+
+XML_PARSER = etree.XMLParser(remove_blank_text=False)
 
 TYPE_MAP = {
     "HTML": {"TemplateType": "HTMLDocument", "Ext": ".html"},
@@ -22,11 +46,9 @@ TYPE_MAP = {
 
 def save_xml_with_bom(tree, path):
     """Save XML tree to file with UTF-8 BOM."""
-    xml_bytes = etree.tostring(tree, xml_declaration=True, encoding="UTF-8")
-    xml_bytes = xml_bytes.replace(b"encoding='UTF-8'", b'encoding="UTF-8"')
     with open(path, "wb") as f:
-        f.write(b"\xef\xbb\xbf")
-        f.write(xml_bytes)
+        f.write(b'\xef\xbb\xbf<?xml version="1.0" encoding="UTF-8"?>\n')
+        tree.write(f, encoding="UTF-8", xml_declaration=False)
 
 
 def write_text_with_bom(path, text):
@@ -35,6 +57,36 @@ def write_text_with_bom(path, text):
         f.write(text)
 
 
+def get_object_node(root):
+    """Return the metadata object element (Catalog, ExternalReport, ...) under <MetaDataObject>."""
+    return next(root.iterchildren(tag=etree.Element), None)
+
+
+def add_child(parent, tag, text=None, indent=""):
+    """Append a child element; indent is the whitespace that follows it."""
+    el = etree.SubElement(parent, tag)
+    el.text = text
+    el.tail = indent
+    return el
+
+
+def build_template_meta(template_uuid, template_name, synonym, template_type):
+    """Build Templates/<TemplateName>.xml; lxml takes care of escaping."""
+    root = etree.Element(f"{{{MD_NS}}}MetaDataObject", nsmap=NSMAP_FULL, version="2.17")
+    root.text = "\n\t"
+    template = add_child(root, f"{{{MD_NS}}}Template", "\n\t\t", "\n")
+    template.set("uuid", template_uuid)
+    props = add_child(template, f"{{{MD_NS}}}Properties", "\n\t\t\t", "\n\t")
+    add_child(props, f"{{{MD_NS}}}Name", template_name, "\n\t\t\t")
+    syn = add_child(props, f"{{{MD_NS}}}Synonym", "\n\t\t\t\t", "\n\t\t\t")
+    item = add_child(syn, f"{{{V8_NS}}}item", "\n\t\t\t\t\t", "\n\t\t\t")
+    add_child(item, f"{{{V8_NS}}}lang", "ru", "\n\t\t\t\t\t")
+    add_child(item, f"{{{V8_NS}}}content", synonym, "\n\t\t\t\t")
+    add_child(props, f"{{{MD_NS}}}Comment", None, "\n\t\t\t")
+    add_child(props, f"{{{MD_NS}}}TemplateType", template_type, "\n\t\t")
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + etree.tostring(root, encoding="unicode")
+
+
 def main():
     sys.stdout.reconfigure(encoding="utf-8")
     sys.stderr.reconfigure(encoding="utf-8")
@@ -81,42 +133,7 @@ def main():
 
     template_uuid = str(uuid.uuid4())
 
-    template_meta_xml = (
-        '<?xml version="1.0" encoding="UTF-8"?>\n'
-        '<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses"'
-        ' xmlns:app="http://v8.1c.ru/8.2/managed-application/core"'
-        ' xmlns:cfg="http://v8.1c.ru/8.1/data/enterprise/current-config"'
-        ' xmlns:cmi="http://v8.1c.ru/8.2/managed-application/cmi"'
-        ' xmlns:ent="http://v8.1c.ru/8.1/data/enterprise"'
-        ' xmlns:lf="http://v8.1c.ru/8.2/managed-application/logform"'
-        ' xmlns:style="http://v8.1c.ru/8.1/data/ui/style"'
-        ' xmlns:sys="http://v8.1c.ru/8.1/data/ui/fonts/system"'
-        ' xmlns:v8="http://v8.1c.ru/8.1/data/core"'
-        ' xmlns:v8ui="http://v8.1c.ru/8.1/data/ui"'
-        ' xmlns:web="http://v8.1c.ru/8.1/data/ui/colors/web"'
-        ' xmlns:win="http://v8.1c.ru/8.1/data/ui/colors/windows"'
-        ' xmlns:xen="http://v8.1c.ru/8.3/xcf/enums"'
-        ' xmlns:xpr="http://v8.1c.ru/8.3/xcf/predef"'
-        ' xmlns:xr="http://v8.1c.ru/8.3/xcf/readable"'
-        ' xmlns:xs="http://www.w3.org/2001/XMLSchema"'
-        ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
-        ' version="2.17">\n'
-        f'\t<Template uuid="{template_uuid}">\n'
-        '\t\t<Properties>\n'
-        f'\t\t\t<Name>{template_name}</Name>\n'
-        '\t\t\t<Synonym>\n'
-        '\t\t\t\t<v8:item>\n'
-        '\t\t\t\t\t<v8:lang>ru</v8:lang>\n'
-        f'\t\t\t\t\t<v8:content>{synonym}</v8:content>\n'
-        '\t\t\t\t</v8:item>\n'
-        '\t\t\t</Synonym>\n'
-        '\t\t\t<Comment/>\n'
-        f'\t\t\t<TemplateType>{tmpl["TemplateType"]}</TemplateType>\n'
-        '\t\t</Properties>\n'
-        '\t</Template>\n'
-        '</MetaDataObject>'
-    )
-
+    template_meta_xml = build_template_meta(template_uuid, template_name, synonym, tmpl["TemplateType"])
     write_text_with_bom(template_meta_path, template_meta_xml)
 
     # --- 2. Template content (Templates/<TemplateName>/Ext/Template.<ext>) ---
@@ -177,21 +194,19 @@ def main():
     # --- 3. Modify root XML ---
 
     root_xml_full = os.path.abspath(root_xml_path)
-    parser_xml = etree.XMLParser(remove_blank_text=False)
-    tree = etree.parse(root_xml_full, parser_xml)
+    tree = etree.parse(root_xml_full, XML_PARSER)
     root = tree.getroot()
 
-    ns = "http://v8.1c.ru/8.3/MDClasses"
-    child_objects = root.find(".//md:ChildObjects", NSMAP)
+    ns = MD_NS
+    object_node = get_object_node(root)
+    child_objects = object_node.find(f"{{{ns}}}ChildObjects") if object_node is not None else None
     if child_objects is None:
         print(f"Не найден элемент ChildObjects в {root_xml_path}", file=sys.stderr)
         sys.exit(1)
 
     # Add <Template> to end of ChildObjects
-    template_elem = etree.SubElement(child_objects, f"{{{ns}}}Template")
+    template_elem = etree.Element(f"{{{ns}}}Template")
     template_elem.text = template_name
-    # Remove auto-appended element to reinsert with proper whitespace
-    child_objects.remove(template_elem)
 
     children = list(child_objects)
     if len(children) == 0 and (child_objects.text is None or child_objects.text.strip() == ""):
@@ -218,21 +233,18 @@ def main():
     main_dcs_updated = False
     if template_type == "DataCompositionSchema":
         report_like_types = ["ExternalReport", "Report"]
-        object_type_node = None
         object_type_name = None
         for rt in report_like_types:
-            node = root.find(f".//md:{rt}", NSMAP)
-            if node is not None:
-                object_type_node = node
+            if object_node.tag == f"{{{ns}}}{rt}":
                 object_type_name = rt
                 break
 
-        if object_type_node is not None:
-            main_dcs = root.find(f".//md:{object_type_name}/md:Properties/md:MainDataCompositionSchema", NSMAP)
+        if object_type_name is not None:
+            main_dcs = object_node.find(f"{{{ns}}}Properties/{{{ns}}}MainDataCompositionSchema")
             if main_dcs is not None:
                 is_empty = main_dcs.text is None or main_dcs.text.strip() == ""
                 if is_empty or set_main_skd:
-                    obj_name_node = root.find(f".//md:{object_type_name}/md:Properties/md:Name", NSMAP)
+                    obj_name_node = object_node.find(f"{{{ns}}}Properties/{{{ns}}}Name")
                     obj_name = obj_name_node.text if obj_name_node is not None else ""
                     main_dcs.text = f"{object_type_name}.{obj_name}.Template.{template_name}"
                     main_dcs_updated = True
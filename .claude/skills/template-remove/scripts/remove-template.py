@@ -4,22 +4,26 @@
 
 import argparse
 import os
-import re
 import shutil
 import sys
 
 from lxml import etree
 
-NSMAP = {"md": "http://v8.1c.ru/8.3/MDClasses"}
+MD_NS = "http://v8.1c.ru/8.3/MDClasses"
+
+XML_PARSER = etree.XMLParser(remove_blank_text=False)
 
 
 def save_xml_with_bom(tree, path):
     """Save XML tree to file with UTF-8 BOM."""
-    xml_bytes = etree.tostring(tree, xml_declaration=True, encoding="UTF-8")
-    xml_bytes = xml_bytes.replace(b"encoding='UTF-8'", b'encoding="UTF-8"')
     with open(path, "wb") as f:
-        f.write(b"\xef\xbb\xbf")
-        f.write(xml_bytes)
+        f.write(b'\xef\xbb\xbf<?xml version="1.0" encoding="UTF-8"?>\n')
+        tree.write(f, encoding="UTF-8", xml_declaration=False)
+
+
+def get_object_node(root):
+    """Return the metadata object element (Catalog, ExternalReport, ...) under <MetaDataObject>."""
+    return next(root.iterchildren(tag=etree.Element), None)
 
 
 def main():
@@ -63,12 +67,14 @@ def main():
     # --- Modify root XML ---
 
     root_xml_full = os.path.abspath(root_xml_path)
-    parser_xml = etree.XMLParser(remove_blank_text=False)
-    tree = etree.parse(root_xml_full, parser_xml)
-    root = tree.getroot()
+    tree = etree.parse(root_xml_full, XML_PARSER)
+    object_node = get_object_node(tree.getroot())
+    template_nodes = object_node.iterfind(f"{{{MD_NS}}}ChildObjects/{{{MD_NS}}}Template") if object_node is not None else ()
+
+    modified = False
 
     # Remove <Template>TemplateName</Template> from ChildObjects
-    for node in root.findall(".//md:ChildObjects/md:Template", NSMAP):
+    for node in template_nodes:
         if node.text and node.text.strip() == template_name:
             parent = node.getparent()
             prev = node.getprevious()
@@ -81,17 +87,20 @@ def main():
                 if parent.text and parent.text.strip() == "":
                     parent.text = ""
             parent.remove(node)
+            modified = True
             break
 
     # Clear MainDataCompositionSchema if it pointed to this template
-    main_dcs = root.find(".//md:MainDataCompositionSchema", NSMAP)
+    main_dcs = object_node.find(f"{{{MD_NS}}}Properties/{{{MD_NS}}}MainDataCompositionSchema") if object_node is not None else None
     if main_dcs is not None and main_dcs.text:
-        if re.search(rf"Template\.{re.escape(template_name)}$", main_dcs.text):
+        if main_dcs.text.endswith(f"Template.{template_name}"):
             main_dcs.text = ""
+            modified = True
             print("[OK] Очищён MainDataCompositionSchema")
 
-    # Save with BOM
-    save_xml_with_bom(tree, root_xml_full)
+    # Save with BOM; an untouched root file is left as is
+    if modified:
+        save_xml_with_bom(tree, root_xml_full)
 
     print(f"[OK] Макет {template_name} удалён из {root_xml_path}")
 
@@ -9,29 +9,85 @@
 """
 
 import argparse
+import codecs
+import functools
 import os
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-import psutil
+# <project>/.claude/skills/<skill>/scripts/<this file>
+PROJECT_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..'))
+
+# httpd.conf is scanned as raw bytes; only the matched groups are decoded
+LISTEN_PATTERN = re.compile(rb'(?m)^Listen\s+(\d+)')
+MODULE_PATTERN = re.compile(rb'LoadModule\s+_1cws_module\s+"([^"]+)"')
+PUB_PATTERN = re.compile(rb'# --- 1C Publication: (.+?) ---')
+IB_PATTERN = re.compile(r'ib="([^"]*)"')
+# Published services in default.vrd, one alternation scanned once
+SERVICE_PATTERN = re.compile(r'(?P<ws><ws\s)|(?P<hs><httpServices\s)|(?P<od>enableStandardOdata\s*=\s*"true")')
+SERVICE_LABELS = (('ws', 'WS'), ('hs', 'HTTP'), ('od', 'OData'))
+
+
+@functools.lru_cache(maxsize=512)
+def norm_path(path):
+    """normcase(normpath(path)), cached: the same exe paths recur across process scans."""
+    return os.path.normcase(os.path.normpath(path))
 
 
 def get_httpd_by_exe(httpd_exe_norm):
     """Get httpd processes matching our exe path."""
+    # Imported here: the "Apache not installed" exit never needs psutil
+    import psutil
     ours = []
     foreign = []
-    for p in psutil.process_iter(['pid', 'name', 'exe']):
+    # Only 'exe' is fetched: the httpd name check uses its basename
+    for p in psutil.process_iter(['pid', 'exe']):
         try:
-            if p.info['name'] and 'httpd' in p.info['name'].lower():
-                if p.info['exe'] and os.path.normcase(os.path.normpath(p.info['exe'])) == httpd_exe_norm:
-                    ours.append(p)
-                else:
-                    foreign.append(p)
+            exe = p.info['exe']
+            if not exe or 'httpd' not in os.path.basename(exe).lower():
+                continue
+            if norm_path(exe) == httpd_exe_norm:
+                ours.append(p)
+            else:
+                foreign.append(p)
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             pass
     return ours, foreign
 
 
+def read_vrd(path):
+    """Read a default.vrd; '' if there is none or it cannot be read."""
+    if path is None:
+        return ''
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return f.read()
+    except OSError:
+        return ''
+
+
+def tail_lines(path, n, block=8192):
+    """Return the last n lines of a text file, reading backwards from the end."""
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        data = b''
+        while pos > 0 and data.count(b'\n') <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    if pos == 0 and data.startswith(b'\xef\xbb\xbf'):
+        data = data[3:]
+    lines = data.split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    if pos > 0:
+        # First chunk starts mid-line
+        lines = lines[1:]
+    return [line.decode('utf-8', errors='replace') for line in lines[-n:]]
+
+
 def main():
     sys.stdout.reconfigure(encoding="utf-8")
     sys.stderr.reconfigure(encoding="utf-8")
@@ -42,9 +98,7 @@ def main():
     # --- Resolve ApachePath ---
     apache_path = args.ApachePath
     if not apache_path:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(script_dir))))
-        apache_path = os.path.join(project_root, 'tools', 'apache24')
+        apache_path = os.path.join(PROJECT_ROOT, 'tools', 'apache24')
 
     # --- Check Apache installation ---
     httpd_exe = os.path.join(apache_path, 'bin', 'httpd.exe')
@@ -59,7 +113,7 @@ def main():
         sys.exit(0)
 
     # --- Check process (only our Apache) ---
-    httpd_exe_norm = os.path.normcase(os.path.normpath(os.path.realpath(httpd_exe)))
+    httpd_exe_norm = norm_path(os.path.realpath(httpd_exe))
     our_proc, foreign_proc = get_httpd_by_exe(httpd_exe_norm)
 
     if our_proc:
@@ -84,52 +138,57 @@ def main():
         print('Config: httpd.conf не найден')
         sys.exit(0)
 
-    with open(conf_file, 'r', encoding='utf-8-sig') as f:
+    with open(conf_file, 'rb') as f:
         conf_content = f.read()
+    if conf_content.startswith(codecs.BOM_UTF8):
+        conf_content = conf_content[len(codecs.BOM_UTF8):]
 
     # Extract port from global block
     port = '\u2014'
-    m = re.search(r'(?m)^Listen\s+(\d+)', conf_content)
+    m = LISTEN_PATTERN.search(conf_content)
     if m:
-        port = m.group(1)
+        port = m.group(1).decode('ascii')
     print(f'Port:   {port}')
 
     # Extract wsap24 path
-    m = re.search(r'LoadModule\s+_1cws_module\s+"([^"]+)"', conf_content)
+    m = MODULE_PATTERN.search(conf_content)
     if m:
-        print(f'Module: {m.group(1)}')
+        print(f"Module: {m.group(1).decode('utf-8', 'replace')}")
 
     # --- Publications ---
     print('')
     print('=== Опубликованные базы ===')
 
-    pub_pattern = r'# --- 1C Publication: (.+?) ---'
-    pub_matches = re.findall(pub_pattern, conf_content)
+    pub_matches = [name.decode('utf-8', 'replace') for name in PUB_PATTERN.findall(conf_content)]
 
     if not pub_matches:
         print('(нет публикаций)')
     else:
-        for app_name in pub_matches:
-            # Read default.vrd for this publication
-            vrd_path = os.path.join(apache_path, 'publish', app_name, 'default.vrd')
+        # One directory read instead of a stat() per publication; normcase keeps isdir()'s case-insensitivity on Windows
+        publish_root = os.path.join(apache_path, 'publish')
+        try:
+            with os.scandir(publish_root) as it:
+                existing = {os.path.normcase(e.name) for e in it if e.is_dir()}
+        except OSError:
+            existing = set()
+
+        # Read every default.vrd concurrently; results come back in publication order
+        vrd_paths = [
+            os.path.join(publish_root, app_name, 'default.vrd') if os.path.normcase(app_name) in existing else None
+            for app_name in pub_matches
+        ]
+        with ThreadPoolExecutor(max_workers=min(8, len(vrd_paths))) as ex:
+            vrd_contents = list(ex.map(read_vrd, vrd_paths))
+
+        for app_name, vrd_content in zip(pub_matches, vrd_contents):
             ib_info = '\u2014'
-            vrd_content = ''
-            if os.path.exists(vrd_path):
-                with open(vrd_path, 'r', encoding='utf-8-sig') as f:
-                    vrd_content = f.read()
-                m = re.search(r'ib="([^"]*)"', vrd_content)
-                if m:
-                    ib_info = m.group(1).replace('&quot;', '"')
+            m = IB_PATTERN.search(vrd_content)
+            if m:
+                ib_info = m.group(1).replace('&quot;', '"')
 
             # Detect published services
-            svc_tags = []
-            if vrd_content:
-                if re.search(r'<ws\s', vrd_content):
-                    svc_tags.append('WS')
-                if re.search(r'<httpServices\s', vrd_content):
-                    svc_tags.append('HTTP')
-                if re.search(r'enableStandardOdata\s*=\s*"true"', vrd_content):
-                    svc_tags.append('OData')
+            found = {m.lastgroup for m in SERVICE_PATTERN.finditer(vrd_content)}
+            svc_tags = [label for group, label in SERVICE_LABELS if group in found]
             svc_label = '   [' + ' '.join(svc_tags) + ']' if svc_tags else ''
 
             url = f'http://localhost:{port}/{app_name}'
@@ -142,11 +201,9 @@ def main():
     error_log = os.path.join(apache_path, 'logs', 'error.log')
     if os.path.exists(error_log):
         try:
-            with open(error_log, 'r', encoding='utf-8-sig', errors='replace') as f:
-                all_lines = f.readlines()
-            tail_lines = all_lines[-5:] if len(all_lines) >= 5 else all_lines
-            if tail_lines:
-                for line in tail_lines:
+            last_lines = tail_lines(error_log, 5)
+            if last_lines:
+                for line in last_lines:
                     print(f'  {line.rstrip()}')
             else:
                 print('(пусто)')
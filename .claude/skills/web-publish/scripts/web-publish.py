@@ -10,10 +10,13 @@
 """
 
 import argparse
+import functools
 import glob
+import hashlib
 import os
 import re
 import shutil
+import socket
 import subprocess
 import sys
 import tempfile
@@ -23,42 +26,153 @@ import zipfile
 
 import psutil
 
+# <project>/.claude/skills/<skill>/scripts/<this file>
+PROJECT_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..'))
 
-def get_our_httpd(httpd_exe_norm):
-    """Filter httpd processes by our ApachePath."""
-    result = []
-    if not httpd_exe_norm:
-        return result
-    for p in psutil.process_iter(['pid', 'name', 'exe']):
-        try:
-            if p.info['name'] and 'httpd' in p.info['name'].lower():
-                if p.info['exe'] and os.path.normcase(os.path.normpath(p.info['exe'])) == httpd_exe_norm:
-                    result.append(p)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-    return result
+SRVROOT_PATTERN = re.compile(r'(?m)^Define SRVROOT .*$')
+LISTEN_PATTERN = re.compile(r'(?m)^(Listen\s+\d+)')
+NON_WORD_PATTERN = re.compile(r'[^\w]')
+
+APACHE_ZIP_URL = 'https://www.apachelounge.com/download/VS18/binaries/httpd-2.4.66-260131-Win64-VS18.zip'
+# SHA-256 of APACHE_ZIP_URL; when None the digest is only reported, not checked
+APACHE_ZIP_SHA256 = None
+
+
+@functools.lru_cache(maxsize=512)
+def norm_path(path):
+    """normcase(normpath(path)), cached: the same exe paths recur across process scans."""
+    return os.path.normcase(os.path.normpath(path))
 
 
-def get_all_httpd():
-    """Get all httpd processes."""
-    result = []
-    for p in psutil.process_iter(['pid', 'name', 'exe']):
+def get_httpd_by_exe(httpd_exe_norm):
+    """Get httpd processes in one scan: (ours, foreign) by exe path."""
+    ours = []
+    foreign = []
+    # Only 'exe' is fetched: the httpd name check uses its basename
+    for p in psutil.process_iter(['pid', 'exe']):
         try:
-            if p.info['name'] and 'httpd' in p.info['name'].lower():
-                result.append(p)
+            exe = p.info['exe']
+            if not exe or 'httpd' not in os.path.basename(exe).lower():
+                continue
+            if norm_path(exe) == httpd_exe_norm:
+                ours.append(p)
+            else:
+                foreign.append(p)
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             pass
-    return result
+    return ours, foreign
 
 
 def check_port_in_use(port):
     """Check if a port is in use and return the owning PID, or None."""
+    # A successful bind proves the port is free without enumerating every socket
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        if hasattr(socket, 'SO_EXCLUSIVEADDRUSE'):
+            probe.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        probe.bind(('0.0.0.0', port))
+        return None
+    except OSError:
+        pass
+    finally:
+        probe.close()
+    # Bind failed: find the listener to report its PID
     for conn in psutil.net_connections(kind='tcp'):
         if conn.laddr and conn.laddr.port == port and conn.status == 'LISTEN':
             return conn.pid
     return None
 
 
+def tail_lines(path, n, block=8192):
+    """Return the last n lines of a text file, reading backwards from the end."""
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        data = b''
+        while pos > 0 and data.count(b'\n') <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    if pos == 0 and data.startswith(b'\xef\xbb\xbf'):
+        data = data[3:]
+    lines = data.split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    if pos > 0:
+        # First chunk starts mid-line
+        lines = lines[1:]
+    return [line.decode('utf-8', errors='replace') for line in lines[-n:]]
+
+
+def extract_apache24(zip_path, dest):
+    """Stream the Apache24/ subtree of the archive straight into dest.
+    Returns False if the archive has no Apache24 directory."""
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        members = zf.infolist()
+        # Outermost Apache24/ directory, wherever it sits in the archive
+        prefix = None
+        for info in members:
+            name = info.filename
+            if name.startswith('Apache24/'):
+                candidate = 'Apache24/'
+            else:
+                i = name.find('/Apache24/')
+                if i < 0:
+                    continue
+                candidate = name[:i + len('/Apache24/')]
+            if prefix is None or len(candidate) < len(prefix):
+                prefix = candidate
+        if prefix is None:
+            return False
+
+        dest_root = os.path.abspath(dest)
+        os.makedirs(dest_root, exist_ok=True)
+        for info in members:
+            if not info.filename.startswith(prefix):
+                continue
+            rel = info.filename[len(prefix):]
+            if not rel:
+                continue
+            target = os.path.normpath(os.path.join(dest_root, rel))
+            if not target.startswith(dest_root + os.sep):
+                continue  # unsafe member path
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with zf.open(info) as src, open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+    return True
+
+
+def download_file(url, path, chunk=1 << 20):
+    """Download url to path in large chunks, hashing on the fly. Returns the SHA-256 hex digest."""
+    h = hashlib.sha256()
+    with urllib.request.urlopen(url, timeout=60) as r, open(path, 'wb') as f:
+        while True:
+            buf = r.read(chunk)
+            if not buf:
+                break
+            h.update(buf)
+            f.write(buf)
+    return h.hexdigest()
+
+
+def wait_for_port(port, proc, timeout=3.0):
+    """Wait until localhost:port accepts connections. Returns False on timeout or if proc exits first."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.1):
+                return True
+        except OSError:
+            pass
+        if proc.poll() is not None:
+            return False
+        time.sleep(0.05)
+    return False
+
+
 def main():
     sys.stdout.reconfigure(encoding="utf-8")
     sys.stderr.reconfigure(encoding="utf-8")
@@ -99,18 +213,31 @@ def main():
         print('Error: укажите -InfoBasePath или -InfoBaseServer + -InfoBaseRef', file=sys.stderr)
         sys.exit(1)
 
+    # --- Derive AppName ---
+    app_name = args.AppName
+    if not app_name:
+        if args.InfoBasePath:
+            app_name = NON_WORD_PATTERN.sub('', os.path.basename(args.InfoBasePath))
+        else:
+            app_name = NON_WORD_PATTERN.sub('', args.InfoBaseRef)
+        app_name = app_name.lower()
+    app_name = app_name.lower()
+
+    if not app_name:
+        print('Error: не удалось определить имя публикации. Укажите -AppName', file=sys.stderr)
+        sys.exit(1)
+
     # --- Resolve ApachePath ---
     apache_path = args.ApachePath
     if not apache_path:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(script_dir))))
-        apache_path = os.path.join(project_root, 'tools', 'apache24')
+        apache_path = os.path.join(PROJECT_ROOT, 'tools', 'apache24')
 
     port = args.Port
 
     # --- Check / Install Apache ---
     httpd_exe = os.path.join(apache_path, 'bin', 'httpd.exe')
 
+    installed = False
     if not os.path.exists(httpd_exe):
         if args.Manual:
             print(f'Apache не найден: {apache_path}')
@@ -122,91 +249,66 @@ def main():
             sys.exit(1)
 
         print('Apache не найден. Скачиваю...')
-        zip_url = 'https://www.apachelounge.com/download/VS18/binaries/httpd-2.4.66-260131-Win64-VS18.zip'
         tmp_zip = os.path.join(tempfile.gettempdir(), 'apache24.zip')
-        tmp_dir = os.path.join(tempfile.gettempdir(), 'apache24_extract')
 
         try:
-            urllib.request.urlretrieve(zip_url, tmp_zip)
+            zip_sha256 = download_file(APACHE_ZIP_URL, tmp_zip)
         except Exception as e:
             print(f'Error: не удалось скачать Apache: {e}', file=sys.stderr)
             print('Скачайте вручную: https://www.apachelounge.com/download/')
             sys.exit(1)
+        if APACHE_ZIP_SHA256 and zip_sha256 != APACHE_ZIP_SHA256:
+            try:
+                os.remove(tmp_zip)
+            except OSError:
+                pass
+            print(f'Error: контрольная сумма архива не совпадает: {zip_sha256}', file=sys.stderr)
+            print('Скачайте вручную: https://www.apachelounge.com/download/')
+            sys.exit(1)
+        print(f'SHA-256: {zip_sha256}')
 
         print('Распаковка...')
-        if os.path.exists(tmp_dir):
-            shutil.rmtree(tmp_dir, ignore_errors=True)
-
-        with zipfile.ZipFile(tmp_zip, 'r') as zf:
-            zf.extractall(tmp_dir)
-
-        # Move Apache24 contents up to ApachePath
-        inner_dir = os.path.join(tmp_dir, 'Apache24')
-        if not os.path.isdir(inner_dir):
-            # Try to find Apache24 in nested folder
-            found_inner = None
-            for root, dirs, files in os.walk(tmp_dir):
-                if 'Apache24' in dirs:
-                    found_inner = os.path.join(root, 'Apache24')
-                    break
-            if found_inner:
-                inner_dir = found_inner
-            else:
-                print('Error: каталог Apache24 не найден в архиве', file=sys.stderr)
-                sys.exit(1)
-
-        os.makedirs(apache_path, exist_ok=True)
-        # Copy contents of inner_dir to apache_path
-        for item in os.listdir(inner_dir):
-            src = os.path.join(inner_dir, item)
-            dst = os.path.join(apache_path, item)
-            if os.path.isdir(src):
-                if os.path.exists(dst):
-                    shutil.rmtree(dst)
-                shutil.copytree(src, dst)
-            else:
-                shutil.copy2(src, dst)
-
-        # Cleanup
+        # A fresh install is unpacked into a sibling staging directory and renamed
+        # into place, so an interrupted unpack never looks like an installed Apache.
+        # An existing directory (publications, logs) is updated in place instead.
+        fresh_install = not os.path.exists(apache_path)
+        extract_dir = apache_path.rstrip('\\/') + '.new' if fresh_install else apache_path
+        if fresh_install and os.path.exists(extract_dir):
+            shutil.rmtree(extract_dir, ignore_errors=True)
         try:
-            os.remove(tmp_zip)
-        except OSError:
-            pass
-        try:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
-        except OSError:
-            pass
+            found = extract_apache24(tmp_zip, extract_dir)
+        finally:
+            try:
+                os.remove(tmp_zip)
+            except OSError:
+                pass
+        if not found:
+            print('Error: каталог Apache24 не найден в архиве', file=sys.stderr)
+            sys.exit(1)
+        if fresh_install:
+            os.replace(extract_dir, apache_path)
+        installed = True
 
-        # Patch ServerRoot in httpd.conf
-        conf_file = os.path.join(apache_path, 'conf', 'httpd.conf')
-        if os.path.exists(conf_file):
-            apache_path_fwd = apache_path.replace('\\', '/')
-            with open(conf_file, 'r', encoding='utf-8-sig') as f:
-                conf_content = f.read()
-            conf_content = re.sub(
-                r'(?m)^Define SRVROOT .*$',
-                f'Define SRVROOT "{apache_path_fwd}"',
-                conf_content,
-            )
-            with open(conf_file, 'w', encoding='utf-8') as f:
-                f.write(conf_content)
-            print(f'ServerRoot обновлён: {apache_path_fwd}')
+    # --- Read httpd.conf (once; all edits below are applied in memory) ---
+    conf_file = os.path.join(apache_path, 'conf', 'httpd.conf')
+    if not os.path.exists(conf_file):
+        print(f'Error: httpd.conf не найден: {conf_file}', file=sys.stderr)
+        sys.exit(1)
 
-        print(f'Apache установлен: {apache_path}')
+    with open(conf_file, 'r', encoding='utf-8-sig') as f:
+        conf_content = f.read()
+    conf_original = conf_content
 
-    # --- Derive AppName ---
-    app_name = args.AppName
-    if not app_name:
-        if args.InfoBasePath:
-            app_name = re.sub(r'[^\w]', '', os.path.basename(args.InfoBasePath))
-        else:
-            app_name = re.sub(r'[^\w]', '', args.InfoBaseRef)
-        app_name = app_name.lower()
-    app_name = app_name.lower()
+    apache_path_fwd = apache_path.replace('\\', '/')
 
-    if not app_name:
-        print('Error: не удалось определить имя публикации. Укажите -AppName', file=sys.stderr)
-        sys.exit(1)
+    if installed:
+        # Patch ServerRoot of the freshly unpacked httpd.conf
+        conf_content = SRVROOT_PATTERN.sub(
+            f'Define SRVROOT "{apache_path_fwd}"',
+            conf_content,
+        )
+        print(f'ServerRoot обновлён: {apache_path_fwd}')
+        print(f'Apache установлен: {apache_path}')
 
     print(f'Публикация: {app_name}')
 
@@ -240,21 +342,26 @@ def main():
     <httpServices publishByDefault="true"/>
 </point>'''
 
-    with open(vrd_path, 'wb') as f:
-        f.write(b'\xef\xbb\xbf')
-        f.write(vrd_content.encode('utf-8'))
-    print(f'default.vrd: {vrd_path}')
+    vrd_data = b'\xef\xbb\xbf' + vrd_content.encode('utf-8')
+    try:
+        with open(vrd_path, 'rb') as f:
+            vrd_changed = f.read() != vrd_data
+    except OSError:
+        vrd_changed = True
+
+    if vrd_changed:
+        # Write to a temp file and swap it in, so readers never see a partial default.vrd
+        vrd_tmp = vrd_path + '.tmp'
+        with open(vrd_tmp, 'wb') as f:
+            f.write(vrd_data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(vrd_tmp, vrd_path)
+        print(f'default.vrd: {vrd_path}')
+    else:
+        print(f'default.vrd: {vrd_path} (без изменений)')
 
     # --- Update httpd.conf ---
-    conf_file = os.path.join(apache_path, 'conf', 'httpd.conf')
-    if not os.path.exists(conf_file):
-        print(f'Error: httpd.conf не найден: {conf_file}', file=sys.stderr)
-        sys.exit(1)
-
-    with open(conf_file, 'r', encoding='utf-8-sig') as f:
-        conf_content = f.read()
-
-    apache_path_fwd = apache_path.replace('\\', '/')
     wsap_dll_fwd = wsap_dll.replace('\\', '/')
     publish_dir_fwd = publish_dir.replace('\\', '/')
     vrd_path_fwd = vrd_path.replace('\\', '/')
@@ -269,13 +376,15 @@ def main():
         f'{global_marker_end}'
     )
 
-    if re.search(re.escape(global_marker_start), conf_content):
+    block_start = conf_content.find(global_marker_start)
+    if block_start >= 0:
         # Replace existing global block
-        pattern = re.escape(global_marker_start) + r'[\s\S]*?' + re.escape(global_marker_end)
-        conf_content = re.sub(pattern, global_block, conf_content)
+        block_end = conf_content.find(global_marker_end, block_start)
+        if block_end >= 0:
+            conf_content = conf_content[:block_start] + global_block + conf_content[block_end + len(global_marker_end):]
     else:
         # Comment out default Listen to avoid port conflict
-        conf_content = re.sub(r'(?m)^(Listen\s+\d+)', r'#\1  # commented by web-publish', conf_content)
+        conf_content = LISTEN_PATTERN.sub(r'#\1  # commented by web-publish', conf_content)
         # Append global block
         conf_content = conf_content.rstrip() + '\n\n' + global_block + '\n'
 
@@ -294,29 +403,37 @@ def main():
         f'{pub_marker_end}'
     )
 
-    if re.search(re.escape(pub_marker_start), conf_content):
+    block_start = conf_content.find(pub_marker_start)
+    if block_start >= 0:
         # Replace existing publication block
-        pattern = re.escape(pub_marker_start) + r'[\s\S]*?' + re.escape(pub_marker_end)
-        conf_content = re.sub(pattern, pub_block, conf_content)
+        block_end = conf_content.find(pub_marker_end, block_start)
+        if block_end >= 0:
+            conf_content = conf_content[:block_start] + pub_block + conf_content[block_end + len(pub_marker_end):]
     else:
         # Append publication block
         conf_content = conf_content.rstrip() + '\n\n' + pub_block + '\n'
 
-    with open(conf_file, 'w', encoding='utf-8') as f:
-        f.write(conf_content)
-    print('httpd.conf обновлён')
+    conf_changed = conf_content != conf_original
+    if conf_changed:
+        with open(conf_file, 'w', encoding='utf-8') as f:
+            f.write(conf_content)
+        print('httpd.conf обновлён')
+    else:
+        print('httpd.conf без изменений')
 
     # --- Normalize httpd_exe for process matching ---
     if os.path.exists(httpd_exe):
-        httpd_exe_norm = os.path.normcase(os.path.normpath(os.path.realpath(httpd_exe)))
+        httpd_exe_norm = norm_path(os.path.realpath(httpd_exe))
     else:
-        httpd_exe_norm = os.path.normcase(os.path.normpath(httpd_exe))
+        httpd_exe_norm = norm_path(httpd_exe)
+
+    # --- Scan httpd processes once for the checks below ---
+    httpd_proc, foreign_httpd = get_httpd_by_exe(httpd_exe_norm)
 
     # --- Check port availability ---
     holder_pid = check_port_in_use(port)
     if holder_pid:
-        our_proc = get_our_httpd(httpd_exe_norm)
-        if not our_proc:
+        if not httpd_proc:
             # Port is held by someone else
             try:
                 holder_proc = psutil.Process(holder_pid)
@@ -328,64 +445,64 @@ def main():
             sys.exit(1)
 
     # --- Start Apache if not running ---
-    httpd_proc = get_our_httpd(httpd_exe_norm)
-    if httpd_proc:
-        first_pid = httpd_proc[0].pid
-        print(f'Apache уже запущен (PID: {first_pid})')
-        print('Перезапуск для применения конфигурации...')
-        for p in httpd_proc:
-            try:
-                p.kill()
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
-        time.sleep(1)
+    if httpd_proc and not (conf_changed or vrd_changed):
+        # Nothing to apply: leave the running instance alone
+        print(f'Apache уже запущен (PID: {httpd_proc[0].pid}), конфигурация не изменилась')
     else:
-        # Check if a foreign httpd holds the port
-        foreign_httpd = get_all_httpd()
-        if foreign_httpd:
-            print(f'[WARN] Обнаружен сторонний Apache (PID: {foreign_httpd[0].pid})')
-            print(f'       Наш Apache: {httpd_exe}')
-
-    print('Запуск Apache...')
-    subprocess.Popen(
-        [httpd_exe],
-        cwd=apache_path,
-        creationflags=subprocess.CREATE_NO_WINDOW,
-    )
-
-    time.sleep(2)
-
-    httpd_check = get_our_httpd(httpd_exe_norm)
-    if httpd_check:
-        print(f'Apache запущен (PID: {httpd_check[0].pid})')
-    else:
-        print('Apache не удалось запустить', file=sys.stderr)
-        # Run config test for diagnostics
-        try:
-            result = subprocess.run(
-                [httpd_exe, '-t'],
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
-            test_output = (result.stdout + result.stderr).strip()
-            if test_output:
-                print('--- httpd -t ---')
-                for line in test_output.splitlines():
-                    print(f'  {line}')
-        except Exception:
-            pass
-        error_log = os.path.join(apache_path, 'logs', 'error.log')
-        if os.path.exists(error_log):
-            print('--- error.log (последние 10 строк) ---')
+        if httpd_proc:
+            first_pid = httpd_proc[0].pid
+            print(f'Apache уже запущен (PID: {first_pid})')
+            print('Перезапуск для применения конфигурации...')
+            for p in httpd_proc:
+                try:
+                    p.kill()
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            psutil.wait_procs(httpd_proc, timeout=5)
+        else:
+            # Check if a foreign httpd holds the port
+            if foreign_httpd:
+                print(f'[WARN] Обнаружен сторонний Apache (PID: {foreign_httpd[0].pid})')
+                print(f'       Наш Apache: {httpd_exe}')
+
+        print('Запуск Apache...')
+        httpd_start = subprocess.Popen(
+            [httpd_exe],
+            cwd=apache_path,
+            creationflags=subprocess.CREATE_NO_WINDOW,
+        )
+
+        wait_for_port(port, httpd_start)
+
+        httpd_check, _ = get_httpd_by_exe(httpd_exe_norm)
+        if httpd_check:
+            print(f'Apache запущен (PID: {httpd_check[0].pid})')
+        else:
+            print('Apache не удалось запустить', file=sys.stderr)
+            # Run config test for diagnostics
             try:
-                with open(error_log, 'r', encoding='utf-8-sig', errors='replace') as f:
-                    all_lines = f.readlines()
-                for line in all_lines[-10:]:
-                    print(line.rstrip())
+                result = subprocess.run(
+                    [httpd_exe, '-t'],
+                    capture_output=True,
+                    text=True,
+                    timeout=10,
+                )
+                test_output = (result.stdout + result.stderr).strip()
+                if test_output:
+                    print('--- httpd -t ---')
+                    for line in test_output.splitlines():
+                        print(f'  {line}')
             except Exception:
                 pass
-        sys.exit(1)
+            error_log = os.path.join(apache_path, 'logs', 'error.log')
+            if os.path.exists(error_log):
+                print('--- error.log (последние 10 строк) ---')
+                try:
+                    for line in tail_lines(error_log, 10):
+                        print(line.rstrip())
+                except Exception:
+                    pass
+            sys.exit(1)
 
     # --- Result ---
     print('')
@@ -8,38 +8,39 @@
 """
 
 import argparse
+import functools
 import os
 import sys
-import time
 
 import psutil
 
+# <project>/.claude/skills/<skill>/scripts/<this file>
+PROJECT_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..'))
 
-def get_our_httpd(httpd_exe_norm):
-    """Filter httpd processes by our ApachePath."""
-    result = []
-    if not httpd_exe_norm:
-        return result
-    for p in psutil.process_iter(['pid', 'name', 'exe']):
-        try:
-            if p.info['name'] and 'httpd' in p.info['name'].lower():
-                if p.info['exe'] and os.path.normcase(os.path.normpath(p.info['exe'])) == httpd_exe_norm:
-                    result.append(p)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-    return result
+
+@functools.lru_cache(maxsize=512)
+def norm_path(path):
+    """normcase(normpath(path)), cached: the same exe paths recur across process scans."""
+    return os.path.normcase(os.path.normpath(path))
 
 
-def get_all_httpd():
-    """Get all httpd processes."""
-    result = []
-    for p in psutil.process_iter(['pid', 'name', 'exe']):
+def get_httpd_by_exe(httpd_exe_norm):
+    """Get httpd processes in one scan: (ours, foreign) by exe path."""
+    ours = []
+    foreign = []
+    # Only 'exe' is fetched: the httpd name check uses its basename
+    for p in psutil.process_iter(['pid', 'exe']):
         try:
-            if p.info['name'] and 'httpd' in p.info['name'].lower():
-                result.append(p)
+            exe = p.info['exe']
+            if not exe or 'httpd' not in os.path.basename(exe).lower():
+                continue
+            if norm_path(exe) == httpd_exe_norm:
+                ours.append(p)
+            else:
+                foreign.append(p)
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             pass
-    return result
+    return ours, foreign
 
 
 def main():
@@ -52,21 +53,18 @@ def main():
     # --- Resolve ApachePath ---
     apache_path = args.ApachePath
     if not apache_path:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(script_dir))))
-        apache_path = os.path.join(project_root, 'tools', 'apache24')
+        apache_path = os.path.join(PROJECT_ROOT, 'tools', 'apache24')
 
     # --- Helper: normalize httpd exe path ---
     httpd_exe = os.path.join(apache_path, 'bin', 'httpd.exe')
     if os.path.exists(httpd_exe):
-        httpd_exe_norm = os.path.normcase(os.path.normpath(os.path.realpath(httpd_exe)))
+        httpd_exe_norm = norm_path(os.path.realpath(httpd_exe))
     else:
-        httpd_exe_norm = os.path.normcase(os.path.normpath(httpd_exe))
+        httpd_exe_norm = norm_path(httpd_exe)
 
     # --- Check process (only our Apache) ---
-    httpd_proc = get_our_httpd(httpd_exe_norm)
+    httpd_proc, foreign = get_httpd_by_exe(httpd_exe_norm)
     if not httpd_proc:
-        foreign = get_all_httpd()
         if foreign:
             print('Наш Apache не запущен')
             print(f'[WARN] Обнаружен сторонний Apache (PID: {foreign[0].pid})')
@@ -85,29 +83,18 @@ def main():
             pass
 
     # --- Wait for shutdown ---
-    max_wait = 5
-    elapsed = 0
-    while elapsed < max_wait:
-        time.sleep(1)
-        elapsed += 1
-        check = get_our_httpd(httpd_exe_norm)
-        if not check:
-            print('Apache остановлен')
-            print('Публикации сохранены. Перезапуск: /web-publish <база>  Удаление: /web-unpublish --all')
-            sys.exit(0)
+    _, alive = psutil.wait_procs(httpd_proc, timeout=5)
 
     # --- Fallback: force kill ---
-    remaining = get_our_httpd(httpd_exe_norm)
-    if remaining:
+    if alive:
         print('Принудительная остановка...')
-        for p in remaining:
+        for p in alive:
             try:
                 p.kill()
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 pass
-        time.sleep(1)
-        final = get_our_httpd(httpd_exe_norm)
-        if final:
+        _, alive = psutil.wait_procs(alive, timeout=2)
+        if alive:
             print('Error: не удалось остановить Apache', file=sys.stderr)
             sys.exit(1)
 
@@ -10,31 +10,126 @@
 """
 
 import argparse
+import functools
 import os
 import re
 import shutil
+import socket
 import subprocess
 import sys
 import time
 
 import psutil
 
+# <project>/.claude/skills/<skill>/scripts/<this file>
+PROJECT_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..'))
+
+PUB_MARKER = '# --- 1C Publication: '
+MARKER_TAIL = ' ---'
+GLOBAL_MARKER_START = '# --- 1C: global ---'
+GLOBAL_MARKER_END = '# --- End: global ---'
+LISTEN_PATTERN = re.compile(r'(?m)^Listen\s+(\d+)')
+
+
+@functools.lru_cache(maxsize=512)
+def norm_path(path):
+    """normcase(normpath(path)), cached: the same exe paths recur across process scans."""
+    return os.path.normcase(os.path.normpath(path))
+
 
 def get_our_httpd(httpd_exe_norm):
     """Filter httpd processes by our ApachePath."""
     result = []
     if not httpd_exe_norm:
         return result
-    for p in psutil.process_iter(['pid', 'name', 'exe']):
+    # Only 'exe' is fetched: a match on our httpd.exe path already implies the name
+    for p in psutil.process_iter(['pid', 'exe']):
         try:
-            if p.info['name'] and 'httpd' in p.info['name'].lower():
-                if p.info['exe'] and os.path.normcase(os.path.normpath(p.info['exe'])) == httpd_exe_norm:
-                    result.append(p)
+            exe = p.info['exe']
+            if exe and norm_path(exe) == httpd_exe_norm:
+                result.append(p)
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             pass
     return result
 
 
+def wait_for_port(port, proc, timeout=3.0):
+    """Wait until localhost:port accepts connections. Returns False on timeout or if proc exits first."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.1):
+                return True
+        except OSError:
+            pass
+        if proc.poll() is not None:
+            return False
+        time.sleep(0.05)
+    return False
+
+
+def block_bounds(conf, start, end_marker, lower):
+    """Span of a marker block plus one newline on each side, starting no earlier than lower."""
+    end = conf.find(end_marker, start)
+    if end < 0:
+        return None
+    if start > lower and conf[start - 1] == '\n':
+        start -= 1
+    end += len(end_marker)
+    if conf.startswith('\n', end):
+        end += 1
+    return start, end
+
+
+def strip_blocks(conf, names=None):
+    """Remove publication blocks from httpd.conf in one pass.
+
+    names=None removes every publication. Each removed block is replaced with a
+    single newline. Returns (new_conf, found, kept): the names of all
+    publication markers seen and of those left in the result.
+    """
+    out = []
+    found = []
+    kept = []
+    pos = 0
+    last_removed = None
+    while True:
+        marker = conf.find(PUB_MARKER, pos)
+        if marker < 0:
+            break
+        name_start = marker + len(PUB_MARKER)
+        line_end = conf.find('\n', name_start)
+        if line_end < 0:
+            line_end = len(conf)
+        tail = conf.find(MARKER_TAIL, name_start + 1, line_end)
+        if tail < 0:
+            out.append(conf[pos:name_start])
+            pos = name_start
+            last_removed = None
+            continue
+        name = conf[name_start:tail]
+        found.append(name)
+        bounds = None
+        if names is None or name in names:
+            bounds = block_bounds(conf, marker, f'# --- End: {name} ---', pos)
+        if bounds is None:
+            kept.append(name)
+            out.append(conf[pos:tail + len(MARKER_TAIL)])
+            pos = tail + len(MARKER_TAIL)
+            last_removed = None
+            continue
+        start, end = bounds
+        # A block right after a removed one of another publication shares its
+        # newline, as if each publication had been removed from the file in turn
+        if marker > pos or last_removed in (None, name):
+            out.append(conf[pos:start])
+            out.append('\n')
+        last_removed = name
+        pos = end
+    out.append(conf[pos:])
+    return ''.join(out), found, kept
+
+
 def main():
     sys.stdout.reconfigure(encoding="utf-8")
     sys.stderr.reconfigure(encoding="utf-8")
@@ -47,9 +142,7 @@ def main():
     # --- Resolve ApachePath ---
     apache_path = args.ApachePath
     if not apache_path:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(script_dir))))
-        apache_path = os.path.join(project_root, 'tools', 'apache24')
+        apache_path = os.path.join(PROJECT_ROOT, 'tools', 'apache24')
 
     # --- Validate params ---
     if not args.All and not args.AppName:
@@ -68,42 +161,36 @@ def main():
     # --- Helper: our httpd process ---
     httpd_exe = os.path.join(apache_path, 'bin', 'httpd.exe')
     if os.path.exists(httpd_exe):
-        httpd_exe_norm = os.path.normcase(os.path.normpath(os.path.realpath(httpd_exe)))
+        httpd_exe_norm = norm_path(os.path.realpath(httpd_exe))
     else:
-        httpd_exe_norm = os.path.normcase(os.path.normpath(httpd_exe))
+        httpd_exe_norm = norm_path(httpd_exe)
 
-    # --- Collect app names to remove ---
+    # --- Remove marker blocks (one pass also collects app names for -All) ---
+    conf_content, found, remaining_pubs = strip_blocks(conf_content, None if args.All else {args.AppName})
     if args.All:
-        pub_pattern = r'# --- 1C Publication: (.+?) ---'
-        pub_matches = re.findall(pub_pattern, conf_content)
-        if not pub_matches:
+        if not found:
             print('Нет публикаций для удаления')
             sys.exit(0)
-        app_names = pub_matches
+        app_names = found
         print(f'Удаление всех публикаций: {", ".join(app_names)}')
     else:
         app_names = [args.AppName]
 
-    # --- Remove marker blocks ---
+    reported = set()
     for name in app_names:
-        pub_marker_start = f'# --- 1C Publication: {name} ---'
-        pub_marker_end = f'# --- End: {name} ---'
-
-        if re.search(re.escape(pub_marker_start), conf_content):
-            pattern = r'\r?\n?' + re.escape(pub_marker_start) + r'[\s\S]*?' + re.escape(pub_marker_end) + r'\r?\n?'
-            conf_content = re.sub(pattern, '\n', conf_content)
+        if name in found and name not in reported:
+            reported.add(name)
             print(f"httpd.conf: блок публикации '{name}' удалён")
         else:
             print(f"Публикация '{name}' не найдена в httpd.conf")
 
-    # --- Check if any publications remain; if not, remove global block ---
-    remaining_pubs = re.findall(r'# --- 1C Publication: .+? ---', conf_content)
+    # --- If no publications remain, remove global block ---
     if not remaining_pubs:
-        global_marker_start = '# --- 1C: global ---'
-        global_marker_end = '# --- End: global ---'
-        if re.search(re.escape(global_marker_start), conf_content):
-            global_pattern = r'\r?\n?' + re.escape(global_marker_start) + r'[\s\S]*?' + re.escape(global_marker_end) + r'\r?\n?'
-            conf_content = re.sub(global_pattern, '\n', conf_content)
+        global_start = conf_content.find(GLOBAL_MARKER_START)
+        if global_start >= 0:
+            bounds = block_bounds(conf_content, global_start, GLOBAL_MARKER_END, 0)
+            if bounds:
+                conf_content = conf_content[:bounds[0]] + '\n' + conf_content[bounds[1]:]
             print('httpd.conf: глобальный блок 1C удалён (нет публикаций)')
 
     with open(conf_file, 'w', encoding='utf-8') as f:
@@ -128,13 +215,16 @@ def main():
                     p.kill()
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     pass
-            time.sleep(1)
-            subprocess.Popen(
+            psutil.wait_procs(httpd_proc, timeout=5)
+            httpd_start = subprocess.Popen(
                 [httpd_exe],
                 cwd=apache_path,
                 creationflags=subprocess.CREATE_NO_WINDOW,
             )
-            time.sleep(2)
+            # Returns as soon as Apache listens, or early if it exits on a config error
+            m = LISTEN_PATTERN.search(conf_content)
+            if m:
+                wait_for_port(int(m.group(1)), httpd_start)
             check = get_our_httpd(httpd_exe_norm)
             if check:
                 print('Apache перезапущен')
@@ -148,7 +238,7 @@ def main():
                     p.kill()
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     pass
-            time.sleep(1)
+            psutil.wait_procs(httpd_proc, timeout=5)
             print('Apache остановлен')
 
     print('')
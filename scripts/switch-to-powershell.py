@@ -2,7 +2,7 @@
 # switch-to-powershell v1.1 — Switch skill .md files back to PowerShell scripts
 # Source: https://github.com/Nikolay-Shirokov/cc-1c-skills
 """Replaces python invocations with powershell.exe in all .md files under .claude/skills/."""
-import os, re, glob, sys
+import os, re, sys
 
 def main():
     print("Совет: используйте 'python scripts/switch.py --runtime powershell' (новый интерфейс)\n")
@@ -10,7 +10,15 @@ def main():
     skills_dir = os.path.join(repo_root, '.claude', 'skills')
 
     # Collect all .md files in skill directories (SKILL.md, json-dsl.md, etc.)
-    md_files = sorted(glob.glob(os.path.join(skills_dir, '*', '*.md')))
+    md_files = []
+    with os.scandir(skills_dir) as skills:
+        for skill in skills:
+            if skill.name.startswith('.') or not skill.is_dir():
+                continue
+            with os.scandir(skill.path) as it:
+                md_files.extend(e.path for e in it
+                                if e.name.endswith('.md') and not e.name.startswith('.') and e.is_file())
+    md_files.sort()
     if not md_files:
         print(f"Error: no .md files found in {skills_dir}", file=sys.stderr)
         sys.exit(1)
@@ -20,8 +28,11 @@ def main():
     warnings = []
 
     for md_path in md_files:
-        with open(md_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        with open(md_path, 'rb') as f:
+            data = f.read()
+        if b'python' not in data:
+            continue
+        content = data.decode('utf-8')
 
         matches = rx.findall(content)
         if not matches:
@@ -43,8 +54,8 @@ def main():
 
         new_content = rx.sub(r'powershell.exe -NoProfile -File \1.ps1', content)
         if new_content != content:
-            with open(md_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
+            with open(md_path, 'wb') as f:
+                f.write(new_content.encode('utf-8'))
             skill_name = os.path.basename(os.path.dirname(md_path))
             md_name = os.path.basename(md_path)
             print(f"  [OK] {skill_name}/{md_name}")
@@ -2,7 +2,7 @@
 # switch-to-python v1.1 — Switch skill .md files to use Python scripts
 # Source: https://github.com/Nikolay-Shirokov/cc-1c-skills
 """Replaces powershell.exe invocations with python in all .md files under .claude/skills/."""
-import os, re, glob, sys
+import os, re, sys
 
 def main():
     print("Совет: используйте 'python scripts/switch.py --runtime python' (новый интерфейс)\n")
@@ -10,18 +10,29 @@ def main():
     skills_dir = os.path.join(repo_root, '.claude', 'skills')
 
     # Collect all .md files in skill directories (SKILL.md, json-dsl.md, etc.)
-    md_files = sorted(glob.glob(os.path.join(skills_dir, '*', '*.md')))
+    md_files = []
+    with os.scandir(skills_dir) as skills:
+        for skill in skills:
+            if skill.name.startswith('.') or not skill.is_dir():
+                continue
+            with os.scandir(skill.path) as it:
+                md_files.extend(e.path for e in it
+                                if e.name.endswith('.md') and not e.name.startswith('.') and e.is_file())
+    md_files.sort()
     if not md_files:
         print(f"Error: no .md files found in {skills_dir}", file=sys.stderr)
         sys.exit(1)
 
-    rx = re.compile(r'powershell\.exe\s+(?:-NoProfile\s+)?-File\s+(.+?)\.ps1')
+    rx = re.compile(r"powershell\.exe\s+(?:-NoProfile\s+)?-File\s+('?[^\s'`]+?)\.ps1")
     switched = 0
     warnings = []
 
     for md_path in md_files:
-        with open(md_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        with open(md_path, 'rb') as f:
+            data = f.read()
+        if b'powershell.exe' not in data:
+            continue
+        content = data.decode('utf-8')
 
         matches = rx.findall(content)
         if not matches:
@@ -39,8 +50,8 @@ def main():
 
         new_content = rx.sub(r'python \1.py', content)
         if new_content != content:
-            with open(md_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
+            with open(md_path, 'wb') as f:
+                f.write(new_content.encode('utf-8'))
             skill_name = os.path.basename(os.path.dirname(md_path))
             md_name = os.path.basename(md_path)
             print(f"  [OK] {skill_name}/{md_name}")
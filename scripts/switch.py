@@ -13,11 +13,14 @@ Kiro, Gemini CLI, OpenCode) с перезаписью путей, и/или пе
   python scripts/switch.py --runtime python          # сменить runtime in-place
 """
 import argparse
-import glob
+import functools
+import hashlib
+import json
 import os
 import re
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # ---------------------------------------------------------------------------
 # Platform registry
@@ -34,84 +37,220 @@ PLATFORMS = {
 
 SOURCE_PREFIX = '.claude/skills'
 
+# .md files are read and written as bytes: decoded once, line endings kept as on disk
+SOURCE_PREFIX_BYTES = (SOURCE_PREFIX + '/').encode('ascii')
+
+COPY_IGNORE = shutil.ignore_patterns('__pycache__', '*.pyc')
+
+# Fingerprints of the last install, kept in the target skills directory
+MANIFEST_NAME = '.switch-manifest.json'
+MANIFEST_VERSION = 1
+
 # ---------------------------------------------------------------------------
 # Runtime regex patterns (from switch-to-python.py / switch-to-powershell.py)
 # ---------------------------------------------------------------------------
-RX_PS = re.compile(r'powershell\.exe\s+(?:-NoProfile\s+)?-File\s+(.+?)\.ps1')
+# The script path is one token (no whitespace, quotes or backticks), so a line
+# without a closing .ps1 fails fast instead of retrying every prefix length
+RX_PS = re.compile(r"powershell\.exe\s+(?:-NoProfile\s+)?-File\s+('?[^\s'`]+?)\.ps1")
 RX_PY = re.compile(r"python\s+('?[\w./_-]+?)\.py")
 
+# target runtime -> (pattern of the other runtime's invocation, replacement template,
+#                    literal every match contains: files without it skip the regex)
+RUNTIME_SWITCH = {
+    'python':     (RX_PS, 'python {}.py', 'powershell.exe'),
+    'powershell': (RX_PY, 'powershell.exe -NoProfile -File {}.ps1', 'python'),
+}
+
+# Install with --runtime python (see make_install_rewriter)
+RX_INSTALL_PY = re.compile(RX_PS.pattern + '|' + re.escape(SOURCE_PREFIX + '/'))
 
-def repo_root():
-    """Return the repository root (parent of scripts/)."""
-    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Repository root (parent of scripts/)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 def source_skills_dir():
-    return os.path.join(repo_root(), '.claude', 'skills')
+    return os.path.join(REPO_ROOT, '.claude', 'skills')
+
+
+@functools.lru_cache(maxsize=4096)
+def script_exists(path):
+    """os.path.isfile, cached: the same scripts are referenced from many .md files."""
+    return os.path.isfile(path)
 
 
 def scan_skills(skills_dir):
     """Return sorted list of skill directory names that contain SKILL.md."""
-    result = []
-    for entry in sorted(os.listdir(skills_dir)):
-        skill_path = os.path.join(skills_dir, entry)
-        if os.path.isdir(skill_path) and os.path.isfile(os.path.join(skill_path, 'SKILL.md')):
-            result.append(entry)
-    return result
+    with os.scandir(skills_dir) as it:
+        return sorted(entry.name for entry in it
+                      if entry.is_dir() and os.path.isfile(os.path.join(entry.path, 'SKILL.md')))
 
 
 def collect_md_files(skill_dir):
-    """Return list of .md files in a skill directory."""
-    return sorted(glob.glob(os.path.join(skill_dir, '*.md')))
+    """Return sorted list of .md files in a skill directory."""
+    # DirEntry.is_file() reuses the type from the directory read; like glob, skip dotfiles
+    with os.scandir(skill_dir) as it:
+        return sorted(entry.path for entry in it
+                      if entry.name.endswith('.md') and not entry.name.startswith('.') and entry.is_file())
 
 
 # ---------------------------------------------------------------------------
 # Transformations
 # ---------------------------------------------------------------------------
-def rewrite_paths(content, source_prefix, target_prefix):
-    """Replace .claude/skills/ path prefix with target platform prefix."""
-    return content.replace(source_prefix + '/', target_prefix + '/')
+def make_install_rewriter(target_prefix, runtime):
+    """Build the .md transform for one install, with its constants bound once.
+
+    Returns (rewrite, triggers): rewrite(content) -> (new_content, paths), where
+    paths are the source-repo script paths (without extension) of the switched
+    invocations; files containing none of the triggers bytes need no rewrite.
+    """
+    source = SOURCE_PREFIX + '/'
+    target = target_prefix + '/'
+
+    if runtime != 'python':
+        def rewrite(content):
+            return content.replace(source, target), []
+        return rewrite, (SOURCE_PREFIX_BYTES,)
+
+    template = RUNTIME_SWITCH['python'][1]
+
+    # PowerShell invocations and bare source prefixes in one pass
+    def rewrite(content):
+        paths = []
+
+        def replace(m):
+            path = m.group(1)
+            if path is None:
+                return target
+            paths.append(path)
+            return template.format(path.replace(source, target))
+
+        return RX_INSTALL_PY.sub(replace, content), paths
+    return rewrite, (SOURCE_PREFIX_BYTES, b'powershell.exe')
 
 
 def switch_runtime_content(content, target_runtime):
-    """Switch runtime invocations in .md content. Returns (new_content, switched)."""
-    if target_runtime == 'python':
-        new = RX_PS.sub(r'python \1.py', content)
-    elif target_runtime == 'powershell':
-        new = RX_PY.sub(r'powershell.exe -NoProfile -File \1.ps1', content)
-    else:
-        return content, False
-    return new, new != content
+    """Switch runtime invocations in .md content in a single regex pass.
+
+    Returns (new_content, paths, switched), where paths are the matched script
+    paths without extension, collected while substituting.
+    """
+    if target_runtime not in RUNTIME_SWITCH:
+        return content, [], False
+    rx, template, needle = RUNTIME_SWITCH[target_runtime]
+    if needle not in content:
+        return content, [], False
+    paths = []
+
+    def replace(m):
+        paths.append(m.group(1))
+        return template.format(m.group(1))
+
+    new, count = rx.subn(replace, content)
+    return new, paths, count > 0
 
 
 def check_runtime_files(skills_dir, target_runtime, root):
     """Check that target runtime script files exist. Returns list of warnings."""
     warnings = []
+    if target_runtime not in RUNTIME_SWITCH:
+        return warnings
+    rx, _, needle = RUNTIME_SWITCH[target_runtime]
+    ext = '.py' if target_runtime == 'python' else '.ps1'
     for skill_name in scan_skills(skills_dir):
         for md_path in collect_md_files(os.path.join(skills_dir, skill_name)):
-            with open(md_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            if target_runtime == 'python':
-                matches = RX_PS.findall(content)
-                for m in matches:
-                    py_path = m.lstrip("'") + '.py'
-                    if not os.path.isfile(os.path.join(root, py_path)):
-                        warnings.append(f"  {py_path} не найден")
-            elif target_runtime == 'powershell':
-                matches = RX_PY.findall(content)
-                for m in matches:
-                    ps1_path = m.lstrip("'") + '.ps1'
-                    if not os.path.isfile(os.path.join(root, ps1_path)):
-                        warnings.append(f"  {ps1_path} не найден")
+            with open(md_path, 'rb') as f:
+                data = f.read()
+            if needle.encode('ascii') not in data:
+                continue
+            content = data.decode('utf-8')
+
+            for m in rx.findall(content):
+                script_path = m.lstrip("'") + ext
+                if not script_exists(os.path.join(root, script_path)):
+                    warnings.append(f"  {script_path} не найден")
     return warnings
 
 
 # ---------------------------------------------------------------------------
 # Commands
 # ---------------------------------------------------------------------------
+def tree_fingerprint(path):
+    """Hash of (relative path, size, mtime) of every file under path, bytecode caches excluded."""
+    h = hashlib.sha1()
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+        for name in sorted(filenames):
+            if name.endswith('.pyc'):
+                continue
+            full = os.path.join(dirpath, name)
+            st = os.stat(full)
+            h.update(f"{os.path.relpath(full, path)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def load_manifest(target_dir, runtime, target_prefix):
+    """Return per-skill entries of the previous install, if it used the same settings."""
+    try:
+        with open(os.path.join(target_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if (manifest.get('version') != MANIFEST_VERSION or manifest.get('runtime') != runtime
+            or manifest.get('target_prefix') != target_prefix):
+        return {}
+    return manifest.get('skills', {})
+
+
+def save_manifest(target_dir, runtime, target_prefix, skills):
+    manifest = {'version': MANIFEST_VERSION, 'runtime': runtime,
+                'target_prefix': target_prefix, 'skills': skills}
+    with open(os.path.join(target_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+
+def install_skill(src_skill, dst_skill, rewriter, previous):
+    """Copy one skill and rewrite its .md files, unless neither side changed since the previous install.
+
+    Returns (manifest entry, copied). The entry lists the source .py paths the
+    .md files refer to.
+    """
+    src_fp = tree_fingerprint(src_skill)
+    if (previous and previous.get('src') == src_fp and 'scripts' in previous
+            and os.path.isdir(dst_skill) and previous.get('dst') == tree_fingerprint(dst_skill)):
+        return previous, False
+
+    # Copy entire skill directory (bytecode caches are local to the source checkout)
+    if os.path.exists(dst_skill):
+        shutil.rmtree(dst_skill)
+    shutil.copytree(src_skill, dst_skill, ignore=COPY_IGNORE)
+
+    rewrite, triggers = rewriter
+    scripts = []
+    # Rewrite paths in all .md files
+    for md_path in collect_md_files(dst_skill):
+        with open(md_path, 'rb') as f:
+            data = f.read()
+        # Files without any trigger (source prefix, PowerShell call) stay as copied
+        if not any(trigger in data for trigger in triggers):
+            continue
+        content = data.decode('utf-8')
+
+        new_content, paths = rewrite(content)
+        scripts.extend(m.lstrip("'") + '.py' for m in paths)
+
+        if new_content != content:
+            with open(md_path, 'wb') as f:
+                f.write(new_content.encode('utf-8'))
+    return {'src': src_fp, 'dst': tree_fingerprint(dst_skill), 'scripts': scripts}, True
+
+
 def cmd_install(platform, runtime, project_dir):
-    """Copy skills to target platform directory with path rewriting."""
+    """Copy skills to target platform directory with path rewriting.
+
+    Skills unchanged on both sides since the previous install with the same
+    runtime (see MANIFEST_NAME) are left as they are.
+    """
     src_dir = source_skills_dir()
     target_prefix = PLATFORMS[platform]
     target_dir = os.path.join(project_dir, target_prefix.replace('/', os.sep))
@@ -121,50 +260,41 @@ def cmd_install(platform, runtime, project_dir):
         print(f"Ошибка: навыки не найдены в {src_dir}", file=sys.stderr)
         return 1
 
+    previous = {}
     if os.path.isdir(target_dir):
         existing = scan_skills(target_dir)
         if existing:
             print(f"В {target_prefix}/ уже есть {len(existing)} навыков. Обновляю...")
-            shutil.rmtree(target_dir)
+            previous = load_manifest(target_dir, runtime, target_prefix)
+            # Skills no longer in the source are removed
+            for skill_name in set(existing).difference(skills):
+                shutil.rmtree(os.path.join(target_dir, skill_name))
 
     os.makedirs(target_dir, exist_ok=True)
 
     installed = 0
     warnings = []
+    entries = {}
+    rewriter = make_install_rewriter(target_prefix, runtime)
 
     print(f"\nКопирование {len(skills)} навыков в {target_prefix}/ ...")
 
-    for skill_name in skills:
-        src_skill = os.path.join(src_dir, skill_name)
-        dst_skill = os.path.join(target_dir, skill_name)
-
-        # Copy entire skill directory
-        shutil.copytree(src_skill, dst_skill)
-
-        # Rewrite paths in all .md files
-        for md_path in collect_md_files(dst_skill):
-            with open(md_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            new_content = rewrite_paths(content, SOURCE_PREFIX, target_prefix)
-
-            # Apply runtime switch if requested
-            if runtime == 'python':
-                new_content, _ = switch_runtime_content(new_content, 'python')
-
-                # Check .py files exist in source repo
-                for m in RX_PS.findall(content):
-                    clean = m.lstrip("'").replace(SOURCE_PREFIX, target_prefix)
-                    original_py = m.lstrip("'") + '.py'
-                    if not os.path.isfile(os.path.join(repo_root(), original_py)):
-                        warnings.append(f"  {original_py} не найден ({skill_name})")
-
-            if new_content != content:
-                with open(md_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-
-        print(f"  [OK] {skill_name}")
-        installed += 1
+    # Skills are independent and the work is file I/O, so copy them in threads;
+    # map() keeps results (and the printed log) in skill order
+    with ThreadPoolExecutor() as pool:
+        results = pool.map(
+            lambda name: install_skill(os.path.join(src_dir, name), os.path.join(target_dir, name),
+                                       rewriter, previous.get(name)),
+            skills)
+        for skill_name, (entry, copied) in zip(skills, results):
+            entries[skill_name] = entry
+            # Check .py files exist in source repo
+            warnings.extend(f"  {py_path} не найден ({skill_name})" for py_path in entry['scripts']
+                            if not script_exists(os.path.join(REPO_ROOT, py_path)))
+            print(f"  [OK] {skill_name}" if copied else f"  [OK] {skill_name} (без изменений)")
+            installed += 1
+
+    save_manifest(target_dir, runtime, target_prefix, entries)
 
     print(f"\nГотово! {installed} навыков установлено в {target_prefix}/")
     if warnings:
@@ -196,6 +326,29 @@ def cmd_undo(platform, project_dir):
     return 0
 
 
+def switch_md_file(md_path, runtime):
+    """Switch runtime in one .md file. Returns (changed, missing target script paths)."""
+    with open(md_path, 'rb') as f:
+        data = f.read()
+    if RUNTIME_SWITCH[runtime][2].encode('ascii') not in data:
+        return False, []
+
+    new_content, scripts, changed = switch_runtime_content(data.decode('utf-8'), runtime)
+
+    # Check target files exist
+    ext = '.py' if runtime == 'python' else '.ps1'
+    missing = []
+    for m in scripts:
+        script_path = m.lstrip("'") + ext
+        if not script_exists(os.path.join(REPO_ROOT, script_path)):
+            missing.append(script_path)
+
+    if changed:
+        with open(md_path, 'wb') as f:
+            f.write(new_content.encode('utf-8'))
+    return changed, missing
+
+
 def cmd_switch_runtime(runtime, project_dir):
     """Switch runtime in-place for skills in the current project."""
     # Find skills directory: try all known platform dirs
@@ -218,34 +371,17 @@ def cmd_switch_runtime(runtime, project_dir):
 
     print(f"\nПереключение на {runtime} в {PLATFORMS[platform_name]}/ ...")
 
-    for skill_name in skills:
-        skill_path = os.path.join(skills_dir, skill_name)
-        for md_path in collect_md_files(skill_path):
-            with open(md_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            new_content, changed = switch_runtime_content(content, runtime)
-
-            # Check target files exist
-            if runtime == 'python':
-                for m in RX_PS.findall(content):
-                    py_path = m.lstrip("'") + '.py'
-                    full = os.path.join(repo_root(), py_path)
-                    if not os.path.isfile(full):
-                        md_name = os.path.basename(md_path)
-                        warnings.append(f"  {py_path} не найден ({skill_name}/{md_name})")
-            elif runtime == 'powershell':
-                for m in RX_PY.findall(content):
-                    ps1_path = m.lstrip("'") + '.ps1'
-                    full = os.path.join(repo_root(), ps1_path)
-                    if not os.path.isfile(full):
-                        md_name = os.path.basename(md_path)
-                        warnings.append(f"  {ps1_path} не найден ({skill_name}/{md_name})")
+    md_files = [(skill_name, md_path)
+                for skill_name in skills
+                for md_path in collect_md_files(os.path.join(skills_dir, skill_name))]
 
+    # Files are independent: process them in threads, report in order
+    with ThreadPoolExecutor() as pool:
+        results = pool.map(lambda item: switch_md_file(item[1], runtime), md_files)
+        for (skill_name, md_path), (changed, missing) in zip(md_files, results):
+            md_name = os.path.basename(md_path)
+            warnings.extend(f"  {script_path} не найден ({skill_name}/{md_name})" for script_path in missing)
             if changed:
-                with open(md_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-                md_name = os.path.basename(md_path)
                 print(f"  [OK] {skill_name}/{md_name}")
                 switched += 1
 